@@ -0,0 +1,683 @@
+"""Sample buffers, a streaming synthesis graph and a sequencer for the
+Cursed Night audio generators.
+
+A buffer is an ``array('d')`` of float samples (-1.0 to 1.0). It behaves
+like the plain lists the generators used to build: ``a + b`` concatenates,
+``a * 4`` repeats and slicing returns a buffer, but the samples sit in one
+contiguous block of memory.
+
+Square, saw and triangle oscillators read band-limited wavetables (one
+per octave of harmonic content) with a drift-free phase and linear
+interpolation, so they stay in tune at any frequency without aliasing.
+
+Synthesis is a graph of nodes (oscillators, envelope, mixer, filters)
+that know their length up front and yield their samples lazily in blocks
+of at most BLOCK_SIZE, so a node can be handed straight to
+wav_writer.write_wav() and rendered in constant memory, however long the
+track. gen_sine(), apply_envelope(), mix() and friends are the same nodes
+rendered into one buffer with Node.render().
+
+levels() measures the peak, RMS and clipped samples of a buffer or node;
+normalize() scales it to a target RMS under a peak ceiling.
+
+When NumPy is importable blocks are NumPy arrays and every node works on
+them as array operations; each sample goes through the same float64
+operations in the same order as on the pure-Python path, so the samples
+(and the WAV files written from them) are bit-identical. Set
+CANVAS_BACKEND=python to force the fallback.
+
+The sequencer renders patterns of (freq, seconds) steps with instruments
+(a stack of oscillator partials over an ADSR envelope). Each note voice is
+rendered once per (instrument, freq, duration, sample rate) and copied
+into the track at its offset (see tools/render_cache.py).
+
+Used by tools/generate_map_and_ui.py and tools/wav_writer.py.
+"""
+import bisect
+import math
+import random
+from array import array
+from collections import namedtuple
+
+from canvas import np
+from render_cache import cached
+from rng_streams import stream
+
+
+BLOCK_SIZE = 4096
+
+
+def view(samples):
+    """Float64 NumPy view of a buffer or snapshot (NumPy backend only)."""
+    if isinstance(samples, (array, memoryview)):
+        return np.frombuffer(samples, dtype=np.float64)
+    return np.asarray(samples, dtype=np.float64)
+
+
+def _zeros(n):
+    """Zero block of n samples for the active backend."""
+    return np.zeros(n) if np is not None else array("d", bytes(8 * n))
+
+
+def _join(blocks):
+    if np is not None:
+        return np.concatenate(blocks)
+    out = array("d")
+    for b in blocks:
+        out.extend(b)
+    return out
+
+
+# ============================================================
+# Graph nodes
+# ============================================================
+
+class Node:
+    """Lazy audio source of a known number of samples.
+
+    Subclasses set ``length`` and implement _block(start, stop), which is
+    called for consecutive ranges in order, or override blocks(). Every
+    call of blocks() yields the same samples, so a node can be analyzed
+    and then written.
+    """
+
+    length = 0
+
+    def blocks(self, size=BLOCK_SIZE):
+        """Yield the samples in order, at most size per block."""
+        for start in range(0, self.length, size):
+            yield self._block(start, min(start + size, self.length))
+
+    def render(self):
+        """All samples as one buffer."""
+        out = array("d", bytes(8 * self.length))
+        dst = view(out) if np is not None else out
+        pos = 0
+        for block in self.blocks():
+            dst[pos:pos + len(block)] = block
+            pos += len(block)
+        return out
+
+
+class _Reader:
+    """Reads a node's blocks back in arbitrary lengths (zero-padded at the end)."""
+
+    def __init__(self, node, size):
+        self._blocks = node.blocks(size)
+        self._pending = _zeros(0)
+
+    def read(self, n):
+        parts, have = [self._pending], len(self._pending)
+        while have < n:
+            block = next(self._blocks, None)
+            if block is None:
+                block = _zeros(n - have)
+            parts.append(block)
+            have += len(block)
+        data = _join(parts) if len(parts) > 1 else self._pending
+        self._pending = data[n:]
+        return data[:n]
+
+
+class Samples(Node):
+    """An existing buffer as a graph source."""
+
+    def __init__(self, samples):
+        self.samples = samples
+        self.length = len(samples)
+        self._data = view(samples) if np is not None else samples
+
+    def _block(self, start, stop):
+        return self._data[start:stop]
+
+
+# ============================================================
+# Wavetables
+# ============================================================
+
+TABLE_SIZE = 2048
+# Harmonic limits of the band-limited tables, one table per octave
+TABLE_HARMONICS = tuple(1 << k for k in range(10))
+
+
+def _harmonic(wave, k):
+    """Fourier amplitude of harmonic k of wave (before normalization)."""
+    if wave == "sine":
+        return 1.0 if k == 1 else 0.0
+    if wave == "saw":
+        return (1.0 if k % 2 else -1.0) / k
+    if k % 2 == 0:
+        return 0.0
+    if wave == "square":
+        return 1.0 / k
+    if wave == "triangle":
+        return (1.0 if k % 4 == 1 else -1.0) / (k * k)
+    raise ValueError(f"unknown wave: {wave}")
+
+
+_tables = {}
+
+
+def wavetables(wave):
+    """Band-limited tables of wave, one per TABLE_HARMONICS limit.
+
+    Each table holds one cycle of the wave with harmonics up to its limit,
+    normalized to a peak of 1.0, in TABLE_SIZE + 1 entries (the last
+    repeats the first, for interpolation). Built once per process; both
+    backends produce the same values.
+    """
+    tables = _tables.get(wave)
+    if tables is not None:
+        return tables
+    sine = [math.sin(2 * math.pi * j / TABLE_SIZE) for j in range(TABLE_SIZE)]
+    if np is not None:
+        sine, j = np.array(sine), np.arange(TABLE_SIZE)
+    acc = _zeros(TABLE_SIZE)
+    tables, done = [], 0
+    for limit in TABLE_HARMONICS:
+        for k in range(done + 1, limit + 1):
+            w = _harmonic(wave, k)
+            if w == 0.0:
+                continue
+            if np is not None:
+                acc += w * sine[(k * j) % TABLE_SIZE]
+            else:
+                for i in range(TABLE_SIZE):
+                    acc[i] += w * sine[(k * i) % TABLE_SIZE]
+        done = limit
+        peak = max(abs(v) for v in acc)
+        if np is not None:
+            table = np.append(acc / peak, acc[0] / peak)
+        else:
+            table = array("d", [v / peak for v in acc])
+            table.append(table[0])
+        tables.append(table)
+    _tables[wave] = tables
+    return tables
+
+
+def band_table(wave, freq, sample_rate=22050):
+    """Table of wave with as many harmonics as fit below Nyquist at freq."""
+    limit = sample_rate / 2 / freq if freq > 0 else TABLE_HARMONICS[-1]
+    tables = wavetables(wave)
+    for table, harmonics in zip(reversed(tables), reversed(TABLE_HARMONICS)):
+        if harmonics <= limit:
+            return table
+    return tables[0]
+
+
+def _read_table(table, pos):
+    """Linearly interpolated table values at pos (0.0 <= pos < TABLE_SIZE)."""
+    if np is not None:
+        i = pos.astype(np.intp)
+        left = table.take(i)
+        return left + (table.take(i + 1) - left) * (pos - i)
+    out = array("d")
+    for x in pos:
+        i = int(x)
+        out.append(table[i] + (table[i + 1] - table[i]) * (x - i))
+    return out
+
+
+class Oscillator(Node):
+    """Band-limited wavetable oscillator.
+
+    The phase advances freq / sample_rate cycles per sample (computed as
+    i * step table positions, so it never drifts) and reads the table for
+    freq with linear interpolation: any frequency stays in tune and
+    nothing aliases.
+    """
+
+    wave = "square"
+
+    def __init__(self, freq, duration, volume=0.3, sample_rate=22050):
+        self.length = int(sample_rate * duration)
+        self.step = freq / sample_rate * TABLE_SIZE
+        self.volume = volume
+        self.table = band_table(self.wave, freq, sample_rate)
+
+    def _block(self, start, stop):
+        step, volume = self.step, self.volume
+        if np is not None:
+            return volume * _read_table(self.table, (np.arange(start, stop) * step) % TABLE_SIZE)
+        wave = _read_table(self.table, [(i * step) % TABLE_SIZE for i in range(start, stop)])
+        return array("d", [volume * v for v in wave])
+
+
+class Square(Oscillator):
+    wave = "square"
+
+
+class Saw(Oscillator):
+    wave = "saw"
+
+
+class Triangle(Oscillator):
+    wave = "triangle"
+
+
+class Sine(Node):
+    """Sine wave.
+
+    Evaluated directly rather than from a table: a single partial cannot
+    alias, and sin() is exact and no slower than an interpolated read.
+    """
+
+    def __init__(self, freq, duration, volume=0.3, sample_rate=22050):
+        self.length = int(sample_rate * duration)
+        self.freq, self.volume, self.sample_rate = freq, volume, sample_rate
+
+    def _block(self, start, stop):
+        freq, volume, sr = self.freq, self.volume, self.sample_rate
+        if np is not None:
+            return volume * np.sin(2 * np.pi * freq * np.arange(start, stop) / sr)
+        return array("d", [volume * math.sin(2 * math.pi * freq * i / sr)
+                           for i in range(start, stop)])
+
+
+class Sweep(Node):
+    """Sine wave gliding linearly from start_freq to end_freq."""
+
+    def __init__(self, start_freq, end_freq, duration, volume=0.3, sample_rate=22050):
+        self.length = int(sample_rate * duration)
+        self.start_freq, self.end_freq = start_freq, end_freq
+        self.volume, self.sample_rate = volume, sample_rate
+
+    def _block(self, start, stop):
+        f0, f1, n = self.start_freq, self.end_freq, self.length
+        volume, sr = self.volume, self.sample_rate
+        if np is not None:
+            i = np.arange(start, stop)
+            freq = f0 + (f1 - f0) * (i / n)
+            return volume * np.sin(2 * np.pi * freq * i / sr)
+        out = array("d")
+        for i in range(start, stop):
+            freq = f0 + (f1 - f0) * (i / n)
+            out.append(volume * math.sin(2 * math.pi * freq * i / sr))
+        return out
+
+
+class Noise(Node):
+    """White noise drawn from rng, or from the current asset's "noise" stream.
+
+    Every pass replays rng from its state at construction.
+    """
+
+    def __init__(self, duration, volume=0.3, sample_rate=22050, rng=None):
+        self.length = int(sample_rate * duration)
+        self.volume = volume
+        self._state = (rng or stream("noise")).getstate()
+
+    def blocks(self, size=BLOCK_SIZE):
+        rng, volume = random.Random(), self.volume
+        rng.setstate(self._state)
+        for start in range(0, self.length, size):
+            n = min(size, self.length - start)
+            if np is not None:
+                r = np.fromiter((rng.random() for _ in range(n)), dtype=np.float64, count=n)
+                yield volume * (r * 2 - 1)
+            else:
+                yield array("d", [volume * (rng.random() * 2 - 1) for _ in range(n)])
+
+
+class ADSR(Node):
+    """Attack/sustain/release envelope over source (linear ramps)."""
+
+    def __init__(self, source, attack=0.01, decay=0.0, sustain=1.0, release=0.05,
+                 sample_rate=22050):
+        self.source = source
+        self.length = source.length
+        self.sustain = sustain
+        self.a_len = int(attack * sample_rate)
+        self.r_len = int(release * sample_rate)
+
+    def blocks(self, size=BLOCK_SIZE):
+        n, a_len, r_len, sustain = self.length, self.a_len, self.r_len, self.sustain
+        pos = 0
+        for block in self.source.blocks(size):
+            if np is not None:
+                i = np.arange(pos, pos + len(block))
+                env = np.where(i < a_len, i / max(a_len, 1),
+                               np.where(i >= n - r_len, (n - i) / max(r_len, 1), sustain))
+                yield block * env
+            else:
+                out = array("d")
+                for i, s in enumerate(block, pos):
+                    if i < a_len:
+                        env = i / max(a_len, 1)
+                    elif i >= n - r_len:
+                        env = (n - i) / max(r_len, 1)
+                    else:
+                        env = sustain
+                    out.append(s * env)
+                yield out
+            pos += len(block)
+
+
+# One input of a Mixer: a node or buffer scaled by gain, starting at sample offset
+Track = namedtuple("Track", "samples gain offset", defaults=(1.0, 0))
+
+LIMIT_MODES = ("clip", "soft", None)
+SOFT_KNEE = 0.8
+
+
+def _soft_limit(x):
+    """Linear up to SOFT_KNEE, then bends smoothly toward 1.0."""
+    if -SOFT_KNEE <= x <= SOFT_KNEE:
+        return x
+    over = (abs(x) - SOFT_KNEE) / (1.0 - SOFT_KNEE)
+    return math.copysign(SOFT_KNEE + (1.0 - SOFT_KNEE) * math.tanh(over), x)
+
+
+class Mixer(Node):
+    """Sum of any number of tracks, limited once.
+
+    Each track is a Track or a bare node/buffer (gain 1.0, offset 0).
+    Nothing is clipped along the way; limit is applied to the sum: "clip"
+    to -1.0..1.0, "soft" for a tanh knee above SOFT_KNEE, None for no
+    limit. length defaults to the end of the longest track.
+    """
+
+    def __init__(self, tracks, length=None, limit="clip"):
+        if limit not in LIMIT_MODES:
+            raise ValueError(f"unknown limit mode: {limit}")
+        self.tracks = []
+        for t in tracks:
+            t = t if isinstance(t, Track) else Track(t)
+            if not isinstance(t.samples, Node):
+                t = t._replace(samples=Samples(t.samples))
+            self.tracks.append(t)
+        if length is None:
+            length = max((t.offset + t.samples.length for t in self.tracks), default=0)
+        self.length = length
+        self.limit = limit
+
+    def blocks(self, size=BLOCK_SIZE):
+        readers = [_Reader(t.samples, size) for t in self.tracks]
+        for start in range(0, self.length, size):
+            stop = min(start + size, self.length)
+            acc = _zeros(stop - start)
+            for t, reader in zip(self.tracks, readers):
+                a = max(start, t.offset)
+                b = min(stop, t.offset + t.samples.length)
+                if a >= b:
+                    continue
+                seg = reader.read(b - a)
+                if np is not None:
+                    acc[a - start:b - start] += seg if t.gain == 1.0 else seg * t.gain
+                else:
+                    for i, v in enumerate(seg, a - start):
+                        acc[i] += v if t.gain == 1.0 else v * t.gain
+            yield self._limit(acc)
+
+    def _limit(self, acc):
+        if self.limit == "clip":
+            if np is not None:
+                return np.clip(acc, -1.0, 1.0)
+            return array("d", [max(-1.0, min(1.0, v)) for v in acc])
+        if self.limit == "soft":
+            if np is not None:
+                # Only the samples above the knee go through math.tanh, which
+                # keeps them bit-identical to the pure-Python path.
+                knee = np.abs(acc) > SOFT_KNEE
+                acc[knee] = [_soft_limit(v) for v in acc[knee].tolist()]
+                return acc
+            return array("d", [_soft_limit(v) for v in acc])
+        return acc
+
+
+class Gain(Node):
+    """source (a node or buffer) scaled by a constant gain."""
+
+    def __init__(self, source, gain):
+        self.source = source if isinstance(source, Node) else Samples(source)
+        self.length = self.source.length
+        self.gain = gain
+
+    def blocks(self, size=BLOCK_SIZE):
+        gain = self.gain
+        for block in self.source.blocks(size):
+            yield block * gain if np is not None else array("d", [v * gain for v in block])
+
+
+class LowPass(Node):
+    """One-pole low-pass filter over source."""
+
+    def __init__(self, source, cutoff, sample_rate=22050):
+        self.source = source
+        self.length = source.length
+        self.alpha = 1.0 - math.exp(-2 * math.pi * cutoff / sample_rate)
+
+    def blocks(self, size=BLOCK_SIZE):
+        alpha, y = self.alpha, 0.0
+        for block in self.source.blocks(size):
+            out = array("d")
+            for x in (block.tolist() if np is not None else block):
+                y += alpha * (x - y)
+                out.append(y)
+            yield view(out) if np is not None else out
+
+
+class LoopFade(Node):
+    """Loop period of a continuous source, faded into its own pre-roll.
+
+    source renders fade samples of pre-roll followed by period samples.
+    The output is those period samples with the last fade of them blended
+    into the pre-roll, i.e. into what comes right before the loop start,
+    so playing it on repeat has no seam. Only the pre-roll is held in
+    memory.
+    """
+
+    def __init__(self, source, period, fade):
+        if source.length != period + fade:
+            raise ValueError(f"source has {source.length} samples, "
+                             f"expected period + fade = {period + fade}")
+        self.source = source
+        self.length = period
+        self.fade = fade
+
+    def blocks(self, size=BLOCK_SIZE):
+        fade, fade_start = self.fade, self.length - self.fade
+        reader = _Reader(self.source, size)
+        pre = reader.read(fade)
+        for start in range(0, self.length, size):
+            stop = min(start + size, self.length)
+            seg = reader.read(stop - start)
+            if stop > fade_start:
+                a = max(start, fade_start)
+                if np is not None:
+                    j = np.arange(a - fade_start, stop - fade_start)
+                    seg = seg.copy()
+                    seg[a - start:] = seg[a - start:] * ((fade - j) / fade) + pre[j] * (j / fade)
+                else:
+                    for k in range(a, stop):
+                        j = k - fade_start
+                        seg[k - start] = (seg[k - start] * ((fade - j) / fade)
+                                          + pre[j] * (j / fade))
+            yield seg
+
+
+# ============================================================
+# Loudness
+# ============================================================
+
+# Peak and RMS level (linear, 1.0 = full scale), the number of samples at or
+# beyond full scale and the total number of samples
+Levels = namedtuple("Levels", "peak rms clipped samples")
+
+NORMALIZE_CEILING_DB = -1.0
+
+
+def dbfs(level):
+    """Linear level in dB relative to full scale (-inf for silence)."""
+    return 20 * math.log10(level) if level > 0 else float("-inf")
+
+
+def from_dbfs(db):
+    """dBFS as a linear level."""
+    return 10 ** (db / 20)
+
+
+def levels(samples, full_scale=1.0):
+    """Levels of a buffer or node, streamed block by block.
+
+    A sample counts as clipped when its magnitude reaches full_scale; a
+    hard-clipped mix sits exactly at 1.0. The sum of squares is exact
+    (math.fsum) on both backends, so the RMS is too.
+    """
+    source = samples if isinstance(samples, Node) else Samples(samples)
+    peak, clipped, squares = 0.0, 0, []
+    for block in source.blocks():
+        if not len(block):
+            continue
+        if np is not None:
+            mag = np.abs(block)
+            peak = max(peak, float(mag.max()))
+            clipped += int(np.count_nonzero(mag >= full_scale))
+            squares.append(math.fsum((block * block).tolist()))
+        else:
+            mag = [abs(v) for v in block]
+            peak = max(peak, max(mag))
+            clipped += sum(1 for m in mag if m >= full_scale)
+            squares.append(math.fsum(v * v for v in block))
+    n = source.length
+    rms = math.sqrt(math.fsum(squares) / n) if n else 0.0
+    return Levels(peak, rms, clipped, n)
+
+
+def normalize(samples, rms_db=None, ceiling_db=NORMALIZE_CEILING_DB):
+    """samples scaled to an RMS of rms_db, or peaking at ceiling_db if None.
+
+    The gain never lifts the peak above ceiling_db. A node comes back as a
+    Gain node (rendered again when written), a buffer as a buffer.
+    """
+    lv = levels(samples)
+    if not lv.peak:
+        return samples
+    gain = from_dbfs(ceiling_db) / lv.peak
+    if rms_db is not None:
+        gain = min(gain, from_dbfs(rms_db) / lv.rms)
+    node = Gain(samples, gain)
+    return node if isinstance(samples, Node) else node.render()
+
+
+# ============================================================
+# Buffer helpers
+# ============================================================
+
+def gen_square(freq, duration, volume=0.3, sample_rate=22050):
+    """Generate square wave samples."""
+    return Square(freq, duration, volume, sample_rate).render()
+
+
+def gen_noise(duration, volume=0.3, sample_rate=22050, rng=None):
+    """Generate white noise samples.
+
+    Draws from rng, or from the current asset's "noise" stream.
+    """
+    return Noise(duration, volume, sample_rate, rng).render()
+
+
+def gen_sine(freq, duration, volume=0.3, sample_rate=22050):
+    """Generate sine wave samples."""
+    return Sine(freq, duration, volume, sample_rate).render()
+
+
+def pitch_sweep(start_freq, end_freq, duration, volume=0.3, sample_rate=22050):
+    """Generate frequency sweep."""
+    return Sweep(start_freq, end_freq, duration, volume, sample_rate).render()
+
+
+def apply_envelope(samples, attack=0.01, decay=0.0, sustain=1.0, release=0.05, sample_rate=22050):
+    """Apply ADSR envelope to samples."""
+    return ADSR(Samples(samples), attack, decay, sustain, release, sample_rate).render()
+
+
+def mix_tracks(tracks, length=None, limit="clip"):
+    """Sum any number of tracks into one buffer in a single pass (see Mixer)."""
+    return Mixer(tracks, length, limit).render()
+
+
+def mix(*arrays, limit="clip"):
+    """Mix sample arrays, limiting the sum once (see Mixer)."""
+    return mix_tracks(arrays, limit=limit)
+
+
+def concat(*arrays):
+    """Concatenate sample arrays."""
+    result = array("d")
+    for a in arrays:
+        result.extend(a if isinstance(a, array) else array("d", a))
+    return result
+
+
+# ============================================================
+# Sequencer
+# ============================================================
+
+# Arguments of apply_envelope()
+Envelope = namedtuple("Envelope", "attack decay sustain release",
+                      defaults=(0.01, 0.0, 1.0, 0.05))
+# One oscillator of an instrument at freq * mul / div; envelope overrides
+# the instrument's
+Partial = namedtuple("Partial", "wave volume mul div envelope", defaults=(1, 1, None))
+Instrument = namedtuple("Instrument", "partials envelope", defaults=(Envelope(),))
+
+OSCILLATORS = {"sine": Sine, "square": Square, "saw": Saw, "triangle": Triangle}
+
+
+@cached
+def render_voice(instrument, freq, duration, sample_rate=22050):
+    """One note of instrument; rendered once, then served from the render cache.
+
+    The partials are summed without limiting; the track they end up in
+    is limited once. The voice is a read-only snapshot: array("d", voice)
+    copies it.
+    """
+    layers = []
+    for partial in instrument.partials:
+        osc = OSCILLATORS[partial.wave](freq * partial.mul / partial.div, duration,
+                                        partial.volume, sample_rate)
+        layers.append(ADSR(osc, *(partial.envelope or instrument.envelope),
+                           sample_rate=sample_rate))
+    return Mixer(layers, limit=None).render()
+
+
+class Sequence(Node):
+    """(instrument, pattern) parts played back to back.
+
+    A pattern is a sequence of (freq, seconds) steps; freq 0 is a rest.
+    """
+
+    def __init__(self, parts, sample_rate=22050):
+        self.notes = []  # (offset, n, instrument, freq, dur)
+        pos = 0
+        for instrument, pattern in parts:
+            for freq, dur in pattern:
+                n = int(sample_rate * dur)
+                if freq != 0:
+                    self.notes.append((pos, n, instrument, freq, dur))
+                pos += n
+        self.offsets = [note[0] for note in self.notes]
+        self.voices = [None] * len(self.notes)  # resolved once per note
+        self.length = pos
+        self.sample_rate = sample_rate
+
+    def _block(self, start, stop):
+        out = _zeros(stop - start)
+        first = max(bisect.bisect_right(self.offsets, start) - 1, 0)
+        for k in range(first, len(self.notes)):
+            pos, n, instrument, freq, dur = self.notes[k]
+            if pos >= stop:
+                break
+            a, b = max(start, pos), min(stop, pos + n)
+            if a >= b:
+                continue
+            voice = self.voices[k]
+            if voice is None:
+                voice = self.voices[k] = render_voice(instrument, freq, dur, self.sample_rate)
+            if np is not None:
+                out[a - start:b - start] = view(voice)[a - pos:b - pos]
+            else:
+                out[a - start:b - start] = array("d", voice[a - pos:b - pos])
+        return out
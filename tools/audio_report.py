@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Loudness report for the generated audio of Cursed Night.
+
+Decodes every WAV under assets/audio and writes one JSON entry per file:
+peak and RMS level in dBFS, the number of clipped samples (samples at the
+largest code of the file's bit depth) and the duration. Exits with status
+1 when any file clips or peaks above --max-peak-db, so CI catches clipping
+instead of a listener.
+
+Usage: python3 tools/audio_report.py [--output FILE] [--max-peak-db DB]
+"""
+import argparse
+import json
+import os
+import struct
+import sys
+
+from audio import dbfs, levels
+from build_assets import ASSETS_DIR
+from wav_writer import decode_wav
+
+
+AUDIO_DIR = os.path.join(ASSETS_DIR, "audio")
+
+
+def _full_scale(data):
+    """Largest decoded magnitude of the WAV's bit depth (IMA decodes to 16 bits)."""
+    fmt = data.index(b"fmt ") + 8
+    bits = struct.unpack_from("<H", data, fmt + 14)[0]
+    bits = 16 if bits < 8 else bits
+    return (2 ** (bits - 1) - 1) / 2 ** (bits - 1)
+
+
+def _db(level):
+    db = dbfs(level)
+    return round(db, 2) if db != float("-inf") else None
+
+
+def file_report(path):
+    """Levels of one WAV file as a JSON-ready dict."""
+    with open(path, "rb") as f:
+        data = f.read()
+    sample_rate, samples = decode_wav(data)
+    lv = levels(samples, _full_scale(data))
+    return {
+        "peak_dbfs": _db(lv.peak),
+        "rms_dbfs": _db(lv.rms),
+        "clipped": lv.clipped,
+        "seconds": round(lv.samples / sample_rate, 3),
+    }
+
+
+def report(root=AUDIO_DIR):
+    """{path relative to assets/: file_report()} for every WAV under root."""
+    files = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.endswith(".wav"):
+                path = os.path.join(dirpath, name)
+                files[os.path.relpath(path, ASSETS_DIR)] = file_report(path)
+    return files
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", "-o", help="write the JSON here (default: stdout)")
+    parser.add_argument("--max-peak-db", type=float, default=0.0,
+                        help="fail when a file peaks above this level (default: 0.0)")
+    args = parser.parse_args(argv)
+
+    files = report()
+    failures = [path for path, r in files.items() if r["clipped"] or (
+        r["peak_dbfs"] is not None and r["peak_dbfs"] > args.max_peak_db)]
+    text = json.dumps({"files": files, "failures": failures}, indent=2) + "\n"
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text)
+    for path in failures:
+        r = files[path]
+        print(f"  {path}: {r['clipped']} clipped samples, peak {r['peak_dbfs']} dBFS",
+              file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""Unified, parallel asset build for Cursed Night.
+
+Collects the asset jobs of every generator module (see asset_jobs() in
+tools/generate_sprites.py and tools/generate_map_and_ui.py), skips the
+ones the manifest reports as up to date, and runs the rest on a process
+pool, longest jobs first. Workers render and encode; the files they
+would write are captured and sent back to this process, which is the
+only writer (streamed outputs such as long WAVs are spooled to temp
+files by the worker and only moved into place here, see
+outputs.capture()). Output is byte-identical to a serial run.
+
+Jobs are rendered, encoded and written one at a time (or at most
+IN_FLIGHT_PER_WORKER per worker in parallel), and each job's canvases and
+encoded bytes are dropped as soon as they are written, so peak memory
+does not grow with the number of assets.
+
+Every job runs inside rng_streams.asset_scope(job.key), so its random
+streams depend only on its own identity. --verify-determinism renders
+every job in declaration order, in reverse order and alone in a fresh
+worker process, and fails if any output differs.
+
+Generators shared by several jobs are memoized per worker process (see
+tools/render_cache.py); the build ends with the cache's hit/miss summary.
+
+Usage: python3 tools/build_assets.py [--jobs N] [--force] [--verify-determinism]
+                                     [generator ...]
+"""
+import argparse
+import importlib
+import os
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import outputs
+import render_cache
+import rng_streams
+from manifest import Manifest, fingerprint, toolchain_hash
+
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                          "assets")
+GENERATORS = ("generate_sprites", "generate_map_and_ui")
+IN_FLIGHT_PER_WORKER = 2
+
+# key: manifest key (output path relative to assets/ for single-file jobs)
+# func: generator whose inputs are fingerprinted
+# action: renders and writes the job's outputs through outputs.write_if_changed()
+# estimate: expected seconds, used for scheduling until a real timing is recorded
+# args: extra inputs of the action (e.g. an output format), fingerprinted with func
+Job = namedtuple("Job", "key func action estimate args", defaults=(0.01, ()))
+
+
+def default_toolchain():
+    """Toolchain hash shared by every generator job."""
+    import audio
+    import canvas
+    import png_writer
+    import wav_writer
+
+    return toolchain_hash(audio, canvas, png_writer, render_cache, rng_streams, wav_writer,
+                          png_writer.DEFAULT_FILTER_MODE, png_writer.DEFAULT_COLOR_MODE)
+
+
+def _module_jobs(module_name):
+    return importlib.import_module(module_name).asset_jobs()
+
+
+def _run_job(module_name, key, spool=False):
+    """Worker entry point: run one job.
+
+    Returns the files it produced (see outputs.capture()), its time and
+    its render cache stats.
+    """
+    job = next(j for j in _module_jobs(module_name) if j.key == key)
+    render_cache.take_stats()
+    start = time.perf_counter()
+    with outputs.capture(spool) as files, rng_streams.asset_scope(job.key):
+        job.action()
+    return files, time.perf_counter() - start, render_cache.take_stats()
+
+
+def build(generators=GENERATORS, jobs=1, force=False):
+    """Build every asset of the given generator modules; returns the stats."""
+    manifest = Manifest(ASSETS_DIR, force=force)
+    toolchain = default_toolchain()
+
+    pending = []
+    for module_name in generators:
+        for job in _module_jobs(module_name):
+            inputs = fingerprint(job.func, job.args, toolchain=toolchain)
+            if manifest.is_fresh(job.key, inputs):
+                outputs.stats.add(outputs.SKIPPED, len(manifest.jobs[job.key]["outputs"]))
+                continue
+            seconds = manifest.jobs.get(job.key, {}).get("seconds", job.estimate)
+            pending.append((seconds, module_name, job, inputs))
+    pending.sort(key=lambda p: -p[0])
+
+    cache = render_cache.CacheStats()
+
+    def finish(n, job, inputs, files, seconds, cache_stats):
+        cache.merge(cache_stats)
+        statuses = [outputs.write_if_changed(path, data) for path, data in files]
+        manifest.record(job.key, inputs, [path for path, _ in files], seconds)
+        summary = ", ".join(sorted(set(statuses))) or "no output"
+        print(f"  [{n}/{len(pending)}] {job.key} {summary} ({seconds:.2f}s)")
+
+    if jobs <= 1:
+        for n, (_, module_name, job, inputs) in enumerate(pending, 1):
+            finish(n, job, inputs, *_run_job(module_name, job.key, True))
+    else:
+        queue = iter(pending)
+        done = 0
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            in_flight = {}
+            while True:
+                while len(in_flight) < jobs * IN_FLIGHT_PER_WORKER:
+                    nxt = next(queue, None)
+                    if nxt is None:
+                        break
+                    _, module_name, job, inputs = nxt
+                    in_flight[pool.submit(_run_job, module_name, job.key, True)] = (job, inputs)
+                if not in_flight:
+                    break
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    done += 1
+                    finish(done, *in_flight.pop(future), *future.result())
+
+    manifest.save()
+    print(f"Files: {outputs.stats.summary()}")
+    print(f"Render cache: {cache.summary()}")
+    return outputs.stats
+
+
+def _run_job_alone(module_name, key):
+    """_run_job() in a worker process of its own."""
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        return pool.submit(_run_job, module_name, key).result()
+
+
+def verify_determinism(generators=GENERATORS, jobs=1):
+    """Check that every job renders the same bytes in any order or process.
+
+    Returns the number of jobs whose outputs differ.
+    """
+    keys = [(m, job.key) for m in generators for job in _module_jobs(m)]
+    forward = {key: _run_job(m, key)[0] for m, key in keys}
+    backward = {key: _run_job(m, key)[0] for m, key in reversed(keys)}
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = {key: pool.submit(_run_job_alone, m, key) for m, key in keys}
+        isolated = {key: f.result()[0] for key, f in futures.items()}
+
+    failures = set()
+    for _, key in keys:
+        for label, run in (("reverse order", backward), ("own process", isolated)):
+            if run[key] != forward[key]:
+                failures.add(key)
+                print(f"  {key}: differs when built in {label}")
+    print(f"Determinism: {len(keys) - len(failures)}/{len(keys)} jobs identical")
+    return len(failures)
+
+
+def main(argv=None, generators=GENERATORS):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count() or 1,
+                        help="worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true",
+                        help="ignore the manifest and regenerate everything")
+    parser.add_argument("--verify-determinism", action="store_true",
+                        help="build every job in different orders and processes "
+                             "and compare the bytes instead of writing files")
+    parser.add_argument("generators", nargs="*", default=list(generators),
+                        help=f"generator modules to build (default: {' '.join(generators)})")
+    args = parser.parse_args(argv)
+    if args.verify_determinism:
+        sys.exit(1 if verify_determinism(args.generators, args.jobs) else 0)
+    build(args.generators, jobs=args.jobs, force=args.force)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
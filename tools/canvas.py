@@ -0,0 +1,634 @@
+"""Shared RGBA canvas for the Cursed Night asset generators.
+
+Pixels live in one contiguous RGBA ``bytearray`` (4 bytes per pixel,
+row-major, ``stride = w * 4``), so whole rows can be filled and copied as
+slices instead of going through ``set()`` one pixel at a time.
+
+Circles, ellipses, polygons and thick lines are rasterized as spans: the
+horizontal extent of each row is computed once and filled as one slice.
+
+When NumPy is importable the other bulk operations (fill_rect,
+noise_fill, blit, scale and the distance transform) run as array
+operations on a view of that same buffer; output is pixel-identical to
+the pure-Python path, which remains the fallback. Set
+CANVAS_BACKEND=python to force the fallback.
+
+ASCII-grid sprites are compiled once into index bytes plus a symbol table
+(cached by grid hash), so painting one is a single palette lookup pass.
+
+snapshot() hands out copy-on-write canvases (used by the render cache in
+tools/render_cache.py): they share immutable pixels until drawn on.
+
+IndexedSprite derives recolored and outlined/aura'd variants of one
+rendered sprite through palette lookup tables over cached masks.
+
+Outlines, auras, multi-ring auras and soft glows all come from one
+two-pass distance transform of the opaque pixels, so they cost the same
+at any radius.
+
+Used by tools/generate_sprites.py and tools/generate_map_and_ui.py.
+"""
+import hashlib
+import math
+import os
+import random
+from collections import namedtuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+if os.environ.get("CANVAS_BACKEND") == "python":
+    np = None
+
+
+TRANSPARENT = (0, 0, 0, 0)
+
+# Distance metrics as (step, diagonal step) weights of a 3x3 chamfer mask;
+# the step is one pixel. "chamfer" (3-4) is within 8% of Euclidean.
+METRICS = {
+    "cityblock": (1, None),
+    "chessboard": (1, 1),
+    "chamfer": (3, 4),
+}
+_FAR = 1 << 40
+
+
+class Canvas:
+    def __init__(self, w, h):
+        self.w = w
+        self.h = h
+        self.stride = w * 4
+        self.buf = bytearray(self.stride * h)
+
+    # --------------------------------------------------------
+    # Pixel access
+    # --------------------------------------------------------
+
+    def set(self, x, y, color):
+        if 0 <= x < self.w and 0 <= y < self.h:
+            self._own()
+            i = int(y) * self.stride + int(x) * 4
+            self.buf[i:i + 4] = bytes(color)
+
+    def get(self, x, y):
+        if 0 <= x < self.w and 0 <= y < self.h:
+            i = int(y) * self.stride + int(x) * 4
+            return tuple(self.buf[i:i + 4])
+        return TRANSPARENT
+
+    def pixels(self):
+        """(h, w, 4) uint8 NumPy view sharing memory with the canvas."""
+        return np.frombuffer(self.buf, dtype=np.uint8).reshape(self.h, self.w, 4)
+
+    def _clip(self, x0, y0, x1, y1):
+        """Clip a box to the canvas; returns None when it is empty."""
+        x0, y0 = max(x0, 0), max(y0, 0)
+        x1, y1 = min(x1, self.w), min(y1, self.h)
+        if x0 >= x1 or y0 >= y1:
+            return None
+        return x0, y0, x1, y1
+
+    def _paint_mask_from(self, x0, y0, src, mask):
+        """Copy src pixels where mask is set; src's top-left sits at (x0, y0)."""
+        x0, y0 = math.floor(x0), math.floor(y0)
+        mh, mw = mask.shape
+        box = self._clip(x0, y0, x0 + mw, y0 + mh)
+        if box is None:
+            return
+        bx0, by0, bx1, by1 = box
+        sy, sx = slice(by0 - y0, by1 - y0), slice(bx0 - x0, bx1 - x0)
+        sub = mask[sy, sx]
+        self._own()
+        self.pixels()[by0:by1, bx0:bx1][sub] = src[sy, sx][sub]
+
+    def _own(self):
+        """Copy shared snapshot pixels before the first write (see snapshot())."""
+        if not isinstance(self.buf, bytearray):
+            self.buf = bytearray(self.buf)
+
+    def snapshot(self):
+        """Copy-on-write canvas with the current pixels.
+
+        Snapshots of one snapshot share a single immutable bytes object;
+        a snapshot copies it only when it is drawn on.
+        """
+        c = Canvas(0, 0)
+        c.w, c.h, c.stride = self.w, self.h, self.stride
+        c.buf = bytes(self.buf)
+        return c
+
+    # --------------------------------------------------------
+    # Drawing
+    # --------------------------------------------------------
+
+    def _hspan(self, x0, x1, y, color):
+        """Fill pixels x0..x1-1 of row y, clipped to the canvas."""
+        self._fill_spans([(y, x0, x1)], color)
+
+    def _fill_spans(self, spans, color):
+        """Fill (y, x0, x1) row spans (pixels x0..x1-1), clipped to the canvas.
+
+        Float coordinates are floored, like set() and get() place them.
+        """
+        self._own()
+        px = bytes(color)
+        buf, w, h, stride = self.buf, self.w, self.h, self.stride
+        floor = math.floor
+        for y, x0, x1 in spans:
+            y, x0, x1 = floor(y), floor(x0), floor(x1)
+            if 0 <= y < h:
+                x0, x1 = max(x0, 0), min(x1, w)
+                if x0 < x1:
+                    i = y * stride
+                    buf[i + x0 * 4:i + x1 * 4] = px * (x1 - x0)
+
+    def fill(self, color):
+        self._own()
+        self.buf[:] = bytes(color) * (self.w * self.h)
+
+    def fill_rect(self, x, y, w, h, color):
+        x, y, w, h = math.floor(x), math.floor(y), int(w), int(h)
+        if np is not None:
+            box = self._clip(x, y, x + w, y + h)
+            if box is not None:
+                x0, y0, x1, y1 = box
+                self._own()
+                self.pixels()[y0:y1, x0:x1] = color
+            return
+        for dy in range(h):
+            self._hspan(x, x + w, y + dy, color)
+
+    def fill_circle(self, cx, cy, r, color):
+        """Fill pixels with x*x + y*y <= r*r around (cx, cy), one span per row."""
+        cx, cy = math.floor(cx), math.floor(cy)
+        spans = []
+        for y in range(max(-r, -cy), min(r, self.h - 1 - cy) + 1):
+            dx = math.isqrt(r * r - y * y)
+            spans.append((cy + y, cx - dx, cx + dx + 1))
+        self._fill_spans(spans, color)
+
+    def fill_ellipse(self, cx, cy, rx, ry, color):
+        """Fill pixels with (x/rx)^2 + (y/ry)^2 <= 1 around (cx, cy), one span per row.
+
+        Each row's half-width is estimated with one sqrt and then settled
+        with the same float test as a per-pixel check.
+        """
+        if rx < 0:
+            return
+        cx, cy = math.floor(cx), math.floor(cy)
+        sx, sy = max(rx, 0.1), max(ry, 0.1)
+        spans = []
+        for y in range(max(-ry, -cy), min(ry, self.h - 1 - cy) + 1):
+            fy = y / sy
+            fy2 = fy * fy
+            dx = min(rx, int(sx * math.sqrt(max(1.0 - fy2, 0.0))))
+            while dx > 0 and (dx / sx) * (dx / sx) + fy2 > 1.0:
+                dx -= 1
+            while dx < rx and ((dx + 1) / sx) * ((dx + 1) / sx) + fy2 <= 1.0:
+                dx += 1
+            spans.append((cy + y, cx - dx, cx + dx + 1))
+        self._fill_spans(spans, color)
+
+    def fill_polygon(self, points, color):
+        """Fill a polygon given as [(x, y), ...] vertices (even-odd rule).
+
+        Coordinates are pixel corners, like fill_rect: a pixel is filled
+        when its center is inside, so [(0, 0), (4, 0), (4, 4), (0, 4)]
+        fills the same pixels as fill_rect(0, 0, 4, 4).
+        """
+        points = list(points)
+        if len(points) < 3:
+            return
+        edges = list(zip(points, points[1:] + points[:1]))
+        ys = [y for _, y in points]
+        spans = []
+        for y in range(max(math.floor(min(ys)), 0), min(math.ceil(max(ys)), self.h)):
+            yc = y + 0.5
+            xs = sorted(ax + (yc - ay) * (bx - ax) / (by - ay)
+                        for (ax, ay), (bx, by) in edges if (ay <= yc) != (by <= yc))
+            spans += [(y, math.ceil(xa - 0.5), math.ceil(xb - 0.5))
+                      for xa, xb in zip(xs[::2], xs[1::2])]
+        self._fill_spans(spans, color)
+
+    def noise_fill(self, base, variation, seed=0):
+        """Fill with noisy color based on base color and variation amount."""
+        self._own()
+        rng = random.Random(seed)
+        if np is not None:
+            n = self.w * self.h
+            offsets = [rng.randint(-variation, variation) for _ in range(n * 3)]
+            rgb = np.array(offsets, dtype=np.int32).reshape(self.h, self.w, 3)
+            rgb += np.array(base[:3], dtype=np.int32)
+            px = self.pixels()
+            px[..., :3] = np.clip(rgb, 0, 255)
+            px[..., 3] = base[3]
+            return
+        out = bytearray(self.stride * self.h)
+        a = base[3]
+        i = 0
+        for _ in range(self.w * self.h):
+            out[i] = max(0, min(255, base[0] + rng.randint(-variation, variation)))
+            out[i + 1] = max(0, min(255, base[1] + rng.randint(-variation, variation)))
+            out[i + 2] = max(0, min(255, base[2] + rng.randint(-variation, variation)))
+            out[i + 3] = a
+            i += 4
+        self.buf[:] = out
+
+    def draw_line(self, x0, y0, x1, y1, color, width=1):
+        """Line between pixels (x0, y0) and (x1, y1).
+
+        width 1 is a Bresenham line; wider lines are filled as a
+        rectangle with square caps reaching width / 2 past each end.
+        """
+        if width > 1:
+            self._thick_line(x0, y0, x1, y1, color, width)
+            return
+        dx = abs(x1 - x0)
+        dy = -abs(y1 - y0)
+        sx = 1 if x0 < x1 else -1
+        sy = 1 if y0 < y1 else -1
+        err = dx + dy
+        while True:
+            self.set(x0, y0, color)
+            if x0 == x1 and y0 == y1:
+                break
+            e2 = 2 * err
+            if e2 >= dy:
+                err += dy
+                x0 += sx
+            if e2 <= dx:
+                err += dx
+                y0 += sy
+
+    def _thick_line(self, x0, y0, x1, y1, color, width):
+        length = math.hypot(x1 - x0, y1 - y0)
+        ux, uy = ((x1 - x0) / length, (y1 - y0) / length) if length else (1.0, 0.0)
+        hw = width / 2
+        ax, ay = x0 + 0.5 - ux * hw, y0 + 0.5 - uy * hw
+        bx, by = x1 + 0.5 + ux * hw, y1 + 0.5 + uy * hw
+        nx, ny = -uy * hw, ux * hw
+        self.fill_polygon([(ax + nx, ay + ny), (bx + nx, by + ny),
+                           (bx - nx, by - ny), (ax - nx, ay - ny)], color)
+
+    def draw_polyline(self, points, color, width=1, closed=False):
+        """Lines through consecutive [(x, y), ...] pixels, back to the first if closed."""
+        points = list(points)
+        if closed and len(points) > 2:
+            points.append(points[0])
+        for (x0, y0), (x1, y1) in zip(points, points[1:]):
+            self.draw_line(x0, y0, x1, y1, color, width)
+
+    # --------------------------------------------------------
+    # Distance-based effects
+    # --------------------------------------------------------
+
+    def _distances(self, metric, solid=None):
+        """Distance of every pixel to the nearest opaque one, in metric units.
+
+        solid replaces the opaque pixels when given: an (h, w) bool array,
+        or a flat sequence of flags without NumPy.
+
+        Two-pass chamfer transform (see METRICS): a pass down the rows and
+        one back up, each relaxing a row from the previous one and then
+        along itself in both directions. Integer weights keep both
+        backends exact. Returns an (h, w) array, or a flat list without
+        NumPy; pixels of an empty canvas stay at _FAR.
+        """
+        a, b = METRICS[metric]
+        w, h = self.w, self.h
+        if np is not None:
+            if solid is None:
+                solid = self.pixels()[..., 3] != 0
+            d = np.where(solid, 0, _FAR).astype(np.int64)
+            ramp = np.arange(w, dtype=np.int64) * a
+            for rows in (range(h), range(h - 1, -1, -1)):
+                prev = None
+                for y in rows:
+                    row = d[y]
+                    if prev is not None:
+                        np.minimum(row, prev + a, out=row)
+                        if b is not None:
+                            np.minimum(row[1:], prev[:-1] + b, out=row[1:])
+                            np.minimum(row[:-1], prev[1:] + b, out=row[:-1])
+                    # min over k of row[k] + a * |x - k|, one side at a time
+                    row[:] = np.minimum.accumulate(row - ramp) + ramp
+                    row[::-1] = np.minimum.accumulate(row[::-1] - ramp) + ramp
+                    prev = row
+            return d
+        d = [0 if v else _FAR for v in (self.buf[3::4] if solid is None else solid)]
+        for rows in (range(h), range(h - 1, -1, -1)):
+            prev = None
+            for y in rows:
+                i = y * w
+                row = d[i:i + w]
+                if prev is not None:
+                    for x in range(w):
+                        v = prev[x] + a
+                        if b is not None:
+                            if x > 0 and prev[x - 1] + b < v:
+                                v = prev[x - 1] + b
+                            if x < w - 1 and prev[x + 1] + b < v:
+                                v = prev[x + 1] + b
+                        if v < row[x]:
+                            row[x] = v
+                for x in range(1, w):
+                    if row[x - 1] + a < row[x]:
+                        row[x] = row[x - 1] + a
+                for x in range(w - 2, -1, -1):
+                    if row[x + 1] + a < row[x]:
+                        row[x] = row[x + 1] + a
+                d[i:i + w] = row
+                prev = row
+        return d
+
+    def _paint_band(self, dist, lo, hi, color):
+        """Paint color on pixels whose distance is in (lo, hi]."""
+        self._own()
+        if np is not None:
+            self.pixels()[(dist > lo) & (dist <= hi)] = color
+            return
+        color = bytes(color)
+        for i, v in enumerate(dist):
+            if lo < v <= hi:
+                self.buf[i * 4:i * 4 + 4] = color
+
+    def add_outline(self, color, width=1, metric="cityblock"):
+        """Paint a ring of width pixels around opaque ones. Returns self.
+
+        The default is the classic 4-neighbour outline.
+        """
+        return self.add_rings([(width, color)], metric)
+
+    def add_aura(self, color, radius=1, metric="chessboard"):
+        """Paint a half-alpha aura up to radius pixels out. Returns self."""
+        r, g, b, a = color
+        return self.add_rings([(radius, (r, g, b, a // 2))], metric)
+
+    def add_rings(self, rings, metric="chessboard"):
+        """Paint concentric (width, color) rings, innermost first. Returns self."""
+        unit = METRICS[metric][0]
+        dist = self._distances(metric)
+        lo = 0
+        for width, color in rings:
+            self._paint_band(dist, lo, lo + width * unit, color)
+            lo += width * unit
+        return self
+
+    def add_glow(self, color, radius, metric="chamfer"):
+        """Paint a glow fading linearly from color's alpha to radius. Returns self.
+
+        Works in time linear in the canvas area, whatever the radius.
+        """
+        unit = METRICS[metric][0]
+        reach = radius * unit
+        r, g, b, a = color
+        dist = self._distances(metric)
+        self._own()
+        if np is not None:
+            band = (dist > 0) & (dist <= reach)
+            px = self.pixels()
+            px[band, :3] = (r, g, b)
+            px[band, 3] = a * (reach + unit - dist[band]) // reach
+            return self
+        for i, v in enumerate(dist):
+            if 0 < v <= reach:
+                self.buf[i * 4:i * 4 + 4] = bytes((r, g, b, a * (reach + unit - v) // reach))
+        return self
+
+    def from_grid(self, grid, palette):
+        """Paint an ASCII grid: each character found in palette sets its pixel.
+
+        The grid is compiled once (see compile_grid); this is a single
+        palette lookup pass over its index bytes.
+        """
+        self._own()
+        compiled = compile_grid(grid)
+        symbols = compiled.symbols
+        w, h = min(compiled.w, self.w), min(compiled.h, self.h)
+        if np is not None:
+            lut = np.zeros((len(symbols) + 1, 4), dtype=np.uint8)
+            paint = np.zeros(len(symbols) + 1, dtype=bool)
+            for i, ch in enumerate(symbols, 1):
+                if ch in palette:
+                    lut[i], paint[i] = palette[ch], True
+            idx = np.frombuffer(compiled.indices, dtype=np.uint8).reshape(
+                compiled.h, compiled.w)[:h, :w]
+            mask = paint[idx]
+            self.pixels()[:h, :w][mask] = lut[idx[mask]]
+            return self
+        table = [None] + [bytes(palette[ch]) if ch in palette else None for ch in symbols]
+        buf, stride = self.buf, self.stride
+        for y, x0, x1, i in _grid_runs(grid):
+            color = table[i]
+            if color is None or y >= h or x0 >= w:
+                continue
+            x1 = min(x1, w)
+            buf[y * stride + x0 * 4:y * stride + x1 * 4] = color * (x1 - x0)
+        return self
+
+    def copy(self):
+        c = Canvas(self.w, self.h)
+        c.buf[:] = self.buf
+        return c
+
+    def scale(self, factor):
+        c = Canvas(self.w * factor, self.h * factor)
+        if np is not None:
+            big = self.pixels().repeat(factor, axis=0).repeat(factor, axis=1)
+            c.pixels()[:] = big
+            return c
+        for y in range(self.h):
+            src = self.buf[y * self.stride:(y + 1) * self.stride]
+            row = bytearray()
+            for x in range(0, self.stride, 4):
+                row += src[x:x + 4] * factor
+            for dy in range(factor):
+                i = (y * factor + dy) * c.stride
+                c.buf[i:i + c.stride] = row
+        return c
+
+    def blit(self, other, ox, oy):
+        if np is not None:
+            src = other.pixels()
+            self._paint_mask_from(ox, oy, src, src[..., 3] > 0)
+            return
+        for y in range(other.h):
+            for x in range(other.w):
+                i = y * other.stride + x * 4
+                if other.buf[i + 3] > 0:
+                    self.set(ox + x, oy + y, other.buf[i:i + 4])
+
+
+# ============================================================
+# Compiled ASCII grids
+# ============================================================
+
+# An ASCII grid as one byte per pixel: indices[y * w + x] is 1 + the position
+# of the pixel's character in symbols, or 0 past the end of a short row
+CompiledGrid = namedtuple("CompiledGrid", "w h symbols indices")
+
+_grids = {}  # grid_key() -> CompiledGrid
+_runs = {}  # grid_key() -> runs of equal indices (pure-Python from_grid only)
+
+
+def grid_key(grid):
+    """Cache key of an ASCII grid."""
+    return hashlib.sha256(grid.encode()).hexdigest()
+
+
+def compile_grid(grid):
+    """CompiledGrid of an ASCII grid (as taken by Canvas.from_grid), cached by hash."""
+    key = grid_key(grid)
+    compiled = _grids.get(key)
+    if compiled is None:
+        rows = grid.strip().split("\n")
+        symbols = "".join(sorted(set("".join(rows))))
+        if len(symbols) > 255:
+            raise ValueError(f"grid uses {len(symbols)} characters, at most 255 fit a byte")
+        code = {ch: i for i, ch in enumerate(symbols, 1)}
+        w, h = max(len(r) for r in rows), len(rows)
+        indices = bytearray(w * h)
+        for y, row in enumerate(rows):
+            indices[y * w:y * w + len(row)] = bytes(code[ch] for ch in row)
+        compiled = _grids[key] = CompiledGrid(w, h, symbols, bytes(indices))
+    return compiled
+
+
+def _grid_runs(grid):
+    """[(y, x0, x1, index), ...]: each row of the compiled grid split into runs."""
+    key = grid_key(grid)
+    runs = _runs.get(key)
+    if runs is not None:
+        return runs
+    compiled, runs = compile_grid(grid), []
+    w = compiled.w
+    for y in range(compiled.h):
+        row = compiled.indices[y * w:(y + 1) * w]
+        x0 = 0
+        for x in range(1, w + 1):
+            if x == w or row[x] != row[x0]:
+                if row[x0]:
+                    runs.append((y, x0, x, row[x0]))
+                x0 = x
+    _runs[key] = runs
+    return runs
+
+
+# ============================================================
+# Indexed sprites and variants
+# ============================================================
+
+# A variant of an IndexedSprite. recolor maps base colors to new ones: a dict
+# of RGBA tuples (missing colors are kept) or a function of the color; fully
+# transparent pixels are never recolored. layers are ("outline" | "aura",
+# size, color) effects painted outward in order, as Canvas.add_outline and
+# Canvas.add_aura would.
+Variant = namedtuple("Variant", "recolor layers", defaults=(None, ()))
+
+_LAYER_METRICS = {"outline": "cityblock", "aura": "chessboard"}
+
+
+def _layer_color(kind, color):
+    r, g, b, a = color
+    return (r, g, b, a // 2) if kind == "aura" else (r, g, b, a)
+
+
+def _layer_key(layers):
+    """What shapes a layer stack's masks: kinds, sizes and which layers are opaque."""
+    return tuple((kind, size, _layer_color(kind, color)[3] > 0) for kind, size, color in layers)
+
+
+class IndexedSprite:
+    """A rendered sprite as palette indices, for recolored and effect variants.
+
+    The base is centered on a w x h canvas (default: its own size) and
+    indexed once. The outline and aura masks of each distinct layer stack
+    are computed once and merged into one composite index image, so every
+    variant is just a palette lookup table over it.
+    """
+
+    def __init__(self, base, w=None, h=None):
+        self.w, self.h = w or base.w, h or base.h
+        self._canvas = Canvas(self.w, self.h)
+        self._canvas.blit(base, (self.w - base.w) // 2, (self.h - base.h) // 2)
+        buf = self._canvas.buf
+        if np is not None:
+            values, inverse = np.unique(np.frombuffer(buf, dtype="<u4"), return_inverse=True)
+            self.colors = [tuple(int(v).to_bytes(4, "little")) for v in values]
+            self.indices = inverse.reshape(self.h, self.w)
+        else:
+            pixels = [tuple(buf[i:i + 4]) for i in range(0, len(buf), 4)]
+            self.colors = sorted(set(pixels))
+            code = {c: i for i, c in enumerate(self.colors)}
+            self.indices = [code[p] for p in pixels]
+        self._composites = {}
+
+    def _composite(self, layers):
+        """Index image of the base with layer k's pixels set to len(colors) + k."""
+        key = _layer_key(layers)
+        if key in self._composites:
+            return self._composites[key]
+        n, canvas = len(self.colors), self._canvas
+        if np is not None:
+            comp = self.indices.copy()
+            solid = canvas.pixels()[..., 3] != 0
+        else:
+            comp = list(self.indices)
+            solid = [v != 0 for v in canvas.buf[3::4]]
+        for k, (kind, size, opaque) in enumerate(key):
+            metric = _LAYER_METRICS[kind]
+            reach = size * METRICS[metric][0]
+            dist = canvas._distances(metric, solid)
+            if np is not None:
+                band = (dist > 0) & (dist <= reach)
+                comp[band] = n + k
+                if opaque:
+                    solid = solid | band
+                continue
+            for i, v in enumerate(dist):
+                if 0 < v <= reach:
+                    comp[i] = n + k
+                    if opaque:
+                        solid[i] = True
+        self._composites[key] = comp
+        return comp
+
+    def _lut(self, variant):
+        recolor = variant.recolor
+        if recolor is None:
+            colors = list(self.colors)
+        elif callable(recolor):
+            colors = [c if c[3] == 0 else tuple(recolor(c)) for c in self.colors]
+        else:
+            colors = [c if c[3] == 0 else tuple(recolor.get(c, c)) for c in self.colors]
+        return colors + [_layer_color(kind, color) for kind, _, color in variant.layers]
+
+    def render(self, variant=Variant()):
+        """Canvas of one variant."""
+        return self.render_all([variant])[0]
+
+    def render_all(self, variants):
+        """Canvases of any number of variants, one lookup pass per layer stack."""
+        variants = list(variants)
+        out = [None] * len(variants)
+        groups = {}
+        for i, v in enumerate(variants):
+            groups.setdefault(_layer_key(v.layers), []).append(i)
+        for members in groups.values():
+            comp = self._composite(variants[members[0]].layers)
+            luts = [self._lut(variants[i]) for i in members]
+            if np is not None:
+                images = np.array(luts, dtype=np.uint8)[:, comp]
+                rendered = [image.tobytes() for image in images]
+            else:
+                rendered = []
+                for lut in luts:
+                    table = [bytes(c) for c in lut]
+                    rendered.append(b"".join([table[i] for i in comp]))
+            for i, data in zip(members, rendered):
+                c = Canvas(self.w, self.h)
+                c.buf[:] = data
+                out[i] = c
+        return out
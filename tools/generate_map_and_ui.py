@@ -7,215 +7,27 @@ Generates:
 - Weapon icons (16x16) for HUD
 - Passive icons (16x16) for HUD
 - SFX (WAV, procedural) for game events
+- BGM loops (WAV, procedural)
 
-Usage: python3 tools/generate_map_and_ui.py
+Usage: python3 tools/generate_map_and_ui.py [--jobs N] [--force]
+
+Assets whose inputs are unchanged since the last run (see
+tools/manifest.py) are skipped; --force regenerates everything. The
+build itself is run by tools/build_assets.py.
 """
 import os
-import struct
-import zlib
+import sys
 import math
 import random
 
-BASE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-
-# ============================================================
-# PNG Writer
-# ============================================================
-
-def write_png(filepath, canvas):
-    w, h = canvas.w, canvas.h
-    raw = b""
-    for row in canvas.data:
-        raw += b"\x00"
-        for r, g, b, a in row:
-            raw += struct.pack("BBBB", r, g, b, a)
-    compressed = zlib.compress(raw, 9)
-
-    def chunk(ctype, cdata):
-        c = ctype + cdata
-        crc = struct.pack(">I", zlib.crc32(c) & 0xFFFFFFFF)
-        return struct.pack(">I", len(cdata)) + c + crc
-
-    sig = b"\x89PNG\r\n\x1a\n"
-    ihdr = struct.pack(">IIBBBBB", w, h, 8, 6, 0, 0, 0)
-    png = sig + chunk(b"IHDR", ihdr) + chunk(b"IDAT", compressed) + chunk(b"IEND", b"")
-    os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
-    with open(filepath, "wb") as f:
-        f.write(png)
-
-
-# ============================================================
-# Canvas
-# ============================================================
-
-class Canvas:
-    def __init__(self, w, h):
-        self.w = w
-        self.h = h
-        self.data = [[(0, 0, 0, 0)] * w for _ in range(h)]
-
-    def set(self, x, y, color):
-        if 0 <= x < self.w and 0 <= y < self.h:
-            self.data[int(y)][int(x)] = color
-
-    def get(self, x, y):
-        if 0 <= x < self.w and 0 <= y < self.h:
-            return self.data[int(y)][int(x)]
-        return (0, 0, 0, 0)
-
-    def fill_rect(self, x, y, w, h, color):
-        for dy in range(h):
-            for dx in range(w):
-                self.set(x + dx, y + dy, color)
-
-    def fill_circle(self, cx, cy, r, color):
-        for y in range(-r, r + 1):
-            for x in range(-r, r + 1):
-                if x * x + y * y <= r * r:
-                    self.set(cx + x, cy + y, color)
-
-    def fill(self, color):
-        for y in range(self.h):
-            for x in range(self.w):
-                self.data[y][x] = color
-
-    def noise_fill(self, base, variation, seed=0):
-        """Fill with noisy color based on base color and variation amount."""
-        rng = random.Random(seed)
-        for y in range(self.h):
-            for x in range(self.w):
-                r = max(0, min(255, base[0] + rng.randint(-variation, variation)))
-                g = max(0, min(255, base[1] + rng.randint(-variation, variation)))
-                b = max(0, min(255, base[2] + rng.randint(-variation, variation)))
-                self.data[y][x] = (r, g, b, base[3])
-
-    def draw_line(self, x0, y0, x1, y1, color):
-        dx = abs(x1 - x0)
-        dy = -abs(y1 - y0)
-        sx = 1 if x0 < x1 else -1
-        sy = 1 if y0 < y1 else -1
-        err = dx + dy
-        while True:
-            self.set(x0, y0, color)
-            if x0 == x1 and y0 == y1:
-                break
-            e2 = 2 * err
-            if e2 >= dy:
-                err += dy
-                x0 += sx
-            if e2 <= dx:
-                err += dx
-                y0 += sy
-
-    def add_outline(self, color):
-        outlined = Canvas(self.w, self.h)
-        for y in range(self.h):
-            for x in range(self.w):
-                outlined.data[y][x] = self.data[y][x]
-        for y in range(self.h):
-            for x in range(self.w):
-                if self.data[y][x][3] == 0:
-                    for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-                        nx, ny = x + dx, y + dy
-                        if 0 <= nx < self.w and 0 <= ny < self.h:
-                            if self.data[ny][nx][3] > 0:
-                                outlined.data[y][x] = color
-                                break
-        return outlined
-
-
-# ============================================================
-# WAV Writer
-# ============================================================
-
-def write_wav(filepath, samples, sample_rate=22050):
-    """Write 16-bit mono WAV file from float samples (-1.0 to 1.0)."""
-    os.makedirs(os.path.dirname(filepath) or ".", exist_ok=True)
-    num_samples = len(samples)
-    data_size = num_samples * 2
-    with open(filepath, "wb") as f:
-        # RIFF header
-        f.write(b"RIFF")
-        f.write(struct.pack("<I", 36 + data_size))
-        f.write(b"WAVE")
-        # fmt chunk
-        f.write(b"fmt ")
-        f.write(struct.pack("<IHHIIHH", 16, 1, 1, sample_rate, sample_rate * 2, 2, 16))
-        # data chunk
-        f.write(b"data")
-        f.write(struct.pack("<I", data_size))
-        for s in samples:
-            val = max(-1.0, min(1.0, s))
-            f.write(struct.pack("<h", int(val * 32767)))
-
-
-def gen_square(freq, duration, volume=0.3, sample_rate=22050):
-    """Generate square wave samples."""
-    n = int(sample_rate * duration)
-    period = sample_rate / freq if freq > 0 else 1
-    return [volume * (1.0 if (i % int(period)) < int(period / 2) else -1.0) for i in range(n)]
-
-
-def gen_noise(duration, volume=0.3, sample_rate=22050):
-    """Generate white noise samples."""
-    rng = random.Random(42)
-    n = int(sample_rate * duration)
-    return [volume * (rng.random() * 2 - 1) for _ in range(n)]
-
-
-def gen_sine(freq, duration, volume=0.3, sample_rate=22050):
-    """Generate sine wave samples."""
-    n = int(sample_rate * duration)
-    return [volume * math.sin(2 * math.pi * freq * i / sample_rate) for i in range(n)]
-
-
-def apply_envelope(samples, attack=0.01, decay=0.0, sustain=1.0, release=0.05, sample_rate=22050):
-    """Apply ADSR envelope to samples."""
-    n = len(samples)
-    a_len = int(attack * sample_rate)
-    r_len = int(release * sample_rate)
-    result = []
-    for i in range(n):
-        if i < a_len:
-            env = i / max(a_len, 1)
-        elif i >= n - r_len:
-            env = (n - i) / max(r_len, 1)
-        else:
-            env = sustain
-        result.append(samples[i] * env)
-    return result
-
-
-def pitch_sweep(start_freq, end_freq, duration, volume=0.3, sample_rate=22050):
-    """Generate frequency sweep."""
-    n = int(sample_rate * duration)
-    samples = []
-    for i in range(n):
-        t = i / n
-        freq = start_freq + (end_freq - start_freq) * t
-        samples.append(volume * math.sin(2 * math.pi * freq * i / sample_rate))
-    return samples
-
-
-def mix(a, b):
-    """Mix two sample arrays."""
-    n = max(len(a), len(b))
-    result = []
-    for i in range(n):
-        va = a[i] if i < len(a) else 0.0
-        vb = b[i] if i < len(b) else 0.0
-        result.append(max(-1.0, min(1.0, va + vb)))
-    return result
-
-
-def concat(*arrays):
-    """Concatenate sample arrays."""
-    result = []
-    for a in arrays:
-        result.extend(a)
-    return result
-
+import build_assets
+from audio import (ADSR, Envelope, Instrument, LoopFade, Mixer, Noise, Partial, Sequence,
+                   Sine, apply_envelope, concat, gen_noise, gen_sine, gen_square, mix,
+                   normalize, pitch_sweep)
+from build_assets import ASSETS_DIR, Job
+from canvas import Canvas
+from png_writer import write_png
+from wav_writer import encoding_report, write_wav
 
 # ============================================================
 # Color Palette (from GDD Section 3.2)
@@ -1274,324 +1086,414 @@ def generate_player_glow():
     return c
 
 
-def generate_sfx():
-    """Generate all game sound effects."""
-    sfx_dir = os.path.join(BASE_DIR, "assets", "audio", "sfx")
+# ============================================================
+# Sound Effect Generation
+# ============================================================
+
+def sfx_enemy_hit():
+    return apply_envelope(gen_square(300, 0.06, 0.4), attack=0.005, release=0.02)
+
 
-    # Enemy hit
-    s = apply_envelope(gen_square(300, 0.06, 0.4), attack=0.005, release=0.02)
-    write_wav(os.path.join(sfx_dir, "enemy_hit.wav"), s)
+def sfx_enemy_death():
+    return apply_envelope(pitch_sweep(400, 100, 0.15, 0.35), attack=0.005, release=0.05)
 
-    # Enemy death
-    s = apply_envelope(pitch_sweep(400, 100, 0.15, 0.35), attack=0.005, release=0.05)
-    write_wav(os.path.join(sfx_dir, "enemy_death.wav"), s)
 
-    # Player hit
+def sfx_player_hit():
     s = apply_envelope(gen_square(200, 0.1, 0.4), attack=0.005, release=0.03)
     s2 = apply_envelope(gen_noise(0.05, 0.15), attack=0.005, release=0.02)
-    write_wav(os.path.join(sfx_dir, "player_hit.wav"), mix(s, s2))
+    return mix(s, s2)
+
 
-    # Level up
+def sfx_level_up():
     notes = [523, 659, 784, 1047]  # C5, E5, G5, C6
     parts = []
     for note in notes:
         parts.append(apply_envelope(gen_sine(note, 0.15, 0.3), release=0.05))
-    s = concat(*parts)
-    write_wav(os.path.join(sfx_dir, "level_up.wav"), s)
+    return concat(*parts)
 
-    # XP gem pickup
-    s = apply_envelope(pitch_sweep(800, 1200, 0.08, 0.25), attack=0.005, release=0.03)
-    write_wav(os.path.join(sfx_dir, "gem_pickup.wav"), s)
 
-    # Item pickup
+def sfx_gem_pickup():
+    return apply_envelope(pitch_sweep(800, 1200, 0.08, 0.25), attack=0.005, release=0.03)
+
+
+def sfx_item_pickup():
     s = apply_envelope(gen_sine(880, 0.08, 0.3), attack=0.005, release=0.03)
     s2 = apply_envelope(gen_sine(1100, 0.06, 0.2), attack=0.01, release=0.02)
-    write_wav(os.path.join(sfx_dir, "item_pickup.wav"), concat(s, s2))
+    return concat(s, s2)
+
 
-    # UI select
-    s = apply_envelope(gen_square(600, 0.05, 0.2), attack=0.005, release=0.02)
-    write_wav(os.path.join(sfx_dir, "ui_select.wav"), s)
+def sfx_ui_select():
+    return apply_envelope(gen_square(600, 0.05, 0.2), attack=0.005, release=0.02)
 
-    # UI confirm
+
+def sfx_ui_confirm():
     s = apply_envelope(gen_sine(800, 0.06, 0.25), attack=0.005, release=0.02)
     s2 = apply_envelope(gen_sine(1000, 0.06, 0.2), attack=0.005, release=0.02)
-    write_wav(os.path.join(sfx_dir, "ui_confirm.wav"), concat(s, s2))
+    return concat(s, s2)
+
 
-    # Boss warning
+def sfx_boss_warning():
     s1 = apply_envelope(gen_square(150, 0.3, 0.4), attack=0.01, release=0.1)
     s2 = apply_envelope(gen_noise(0.3, 0.15), attack=0.01, release=0.1)
-    write_wav(os.path.join(sfx_dir, "boss_warning.wav"), mix(s1, s2))
+    return mix(s1, s2)
+
 
-    # Boss death
+def sfx_boss_death():
     s1 = apply_envelope(pitch_sweep(200, 50, 0.5, 0.4), attack=0.01, release=0.15)
     s2 = apply_envelope(gen_noise(0.5, 0.2), attack=0.01, release=0.15)
-    write_wav(os.path.join(sfx_dir, "boss_death.wav"), mix(s1, s2))
+    return mix(s1, s2)
 
-    # Weapon: slash
+
+def sfx_weapon_slash():
     s = apply_envelope(pitch_sweep(600, 200, 0.08, 0.3), attack=0.005, release=0.03)
     n = apply_envelope(gen_noise(0.06, 0.15), attack=0.005, release=0.02)
-    write_wav(os.path.join(sfx_dir, "weapon_slash.wav"), mix(s, n))
+    return mix(s, n)
+
 
-    # Weapon: fire
+def sfx_weapon_fire():
     s = apply_envelope(pitch_sweep(300, 150, 0.12, 0.25), attack=0.005, release=0.04)
     n = apply_envelope(gen_noise(0.12, 0.2), attack=0.01, release=0.04)
-    write_wav(os.path.join(sfx_dir, "weapon_fire.wav"), mix(s, n))
+    return mix(s, n)
+
 
-    # Weapon: magic
-    s = apply_envelope(pitch_sweep(500, 800, 0.1, 0.25), attack=0.005, release=0.04)
-    write_wav(os.path.join(sfx_dir, "weapon_magic.wav"), s)
+def sfx_weapon_magic():
+    return apply_envelope(pitch_sweep(500, 800, 0.1, 0.25), attack=0.005, release=0.04)
 
-    # Heal
+
+def sfx_heal():
     notes = [659, 784, 880]  # E5, G5, A5
     parts = []
     for note in notes:
         parts.append(apply_envelope(gen_sine(note, 0.12, 0.2), release=0.04))
-    write_wav(os.path.join(sfx_dir, "heal.wav"), concat(*parts))
+    return concat(*parts)
+
 
-    # Chest open
+def sfx_chest_open():
     s1 = apply_envelope(gen_noise(0.05, 0.2), attack=0.005, release=0.02)
     s2 = apply_envelope(gen_sine(600, 0.1, 0.3), attack=0.01, release=0.04)
     s3 = apply_envelope(gen_sine(900, 0.1, 0.2), attack=0.01, release=0.04)
-    write_wav(os.path.join(sfx_dir, "chest_open.wav"), concat(s1, mix(s2, s3)))
+    return concat(s1, mix(s2, s3))
+
 
-    # Revive
+def sfx_revive():
     notes = [440, 554, 659, 880]  # A4, C#5, E5, A5
     parts = []
     for note in notes:
         parts.append(apply_envelope(gen_sine(note, 0.2, 0.25), release=0.06))
-    write_wav(os.path.join(sfx_dir, "revive.wav"), concat(*parts))
+    return concat(*parts)
 
-    # Thunder (for Stage 2 lightning)
+
+def sfx_thunder():
+    # For Stage 2 lightning
     s = apply_envelope(gen_noise(0.4, 0.5), attack=0.005, sustain=0.6, release=0.2)
     s2 = apply_envelope(gen_square(60, 0.3, 0.2), attack=0.01, release=0.15)
-    write_wav(os.path.join(sfx_dir, "thunder.wav"), mix(s, s2))
+    return mix(s, s2)
+
 
-    # Game over
+def sfx_game_over():
     notes = [392, 349, 330, 262]  # G4, F4, E4, C4 - descending
     parts = []
     for note in notes:
         parts.append(apply_envelope(gen_sine(note, 0.25, 0.3), release=0.08))
-    write_wav(os.path.join(sfx_dir, "game_over.wav"), concat(*parts))
+    return concat(*parts)
+
 
-    # Victory
+def sfx_victory():
     notes = [523, 659, 784, 1047, 1319]  # C5, E5, G5, C6, E6 - ascending
     parts = []
     for note in notes:
         parts.append(apply_envelope(gen_sine(note, 0.18, 0.3), release=0.05))
-    write_wav(os.path.join(sfx_dir, "victory.wav"), concat(*parts))
+    return concat(*parts)
 
 
 # ============================================================
 # BGM Generation (simple ambient loops)
 # ============================================================
 
-def generate_bgm():
-    """Generate simple ambient BGM loops."""
-    bgm_dir = os.path.join(BASE_DIR, "assets", "audio", "bgm")
-    sr = 22050
-
-    # Stage 1: Dark music box melody
-    def music_box_melody():
-        # Simple pentatonic melody notes (in Hz) with pauses
-        melody = [
-            (523, 0.4), (0, 0.1), (659, 0.3), (0, 0.1),
-            (587, 0.4), (0, 0.1), (523, 0.3), (0, 0.2),
-            (440, 0.5), (0, 0.1), (523, 0.3), (0, 0.1),
-            (587, 0.4), (0, 0.3),
-            (523, 0.4), (0, 0.1), (440, 0.3), (0, 0.1),
-            (392, 0.5), (0, 0.1), (440, 0.3), (0, 0.1),
-            (523, 0.6), (0, 0.5),
-        ]
-        samples = []
-        for freq, dur in melody:
-            if freq == 0:
-                samples.extend([0.0] * int(sr * dur))
-            else:
-                note = apply_envelope(gen_sine(freq, dur, 0.15), attack=0.01, release=0.05, sample_rate=sr)
-                # Add slight detuned harmonics for music box feel
-                h2 = apply_envelope(gen_sine(freq * 2, dur, 0.05), attack=0.01, release=0.05, sample_rate=sr)
-                h3 = apply_envelope(gen_sine(freq * 3, dur, 0.02), attack=0.01, release=0.05, sample_rate=sr)
-                mixed = mix(mix(note, h2), h3)
-                samples.extend(mixed)
-        return samples
-
-    # Repeat melody 4 times for ~30s loop
-    mel = music_box_melody()
-    stage1_bgm = mel * 4
-    # Add subtle low drone
-    drone = gen_sine(110, len(stage1_bgm) / sr, 0.03, sr)
-    stage1_bgm = mix(stage1_bgm, drone[:len(stage1_bgm)])
-    write_wav(os.path.join(bgm_dir, "stage1_town.wav"), stage1_bgm, sr)
-
-    # Stage 2: Darker ambient
-    def cemetery_ambient():
-        melody = [
-            (330, 0.5), (0, 0.3), (294, 0.4), (0, 0.2),
-            (262, 0.6), (0, 0.3), (247, 0.4), (0, 0.2),
-            (220, 0.8), (0, 0.5),
-            (247, 0.4), (0, 0.2), (262, 0.5), (0, 0.3),
-            (220, 0.7), (0, 0.8),
-        ]
-        samples = []
-        for freq, dur in melody:
-            if freq == 0:
-                samples.extend([0.0] * int(sr * dur))
-            else:
-                note = apply_envelope(gen_sine(freq, dur, 0.1), attack=0.02, release=0.08, sample_rate=sr)
-                samples.extend(note)
-        return samples
-
-    mel = cemetery_ambient()
-    stage2_bgm = mel * 4
-    # Add wind noise
-    wind = apply_envelope(gen_noise(len(stage2_bgm) / sr, 0.04, sr), attack=0.5, sustain=0.8, release=0.5, sample_rate=sr)
-    stage2_bgm = mix(stage2_bgm, wind[:len(stage2_bgm)])
-    write_wav(os.path.join(bgm_dir, "stage2_cemetery.wav"), stage2_bgm, sr)
-
-    # Title: Calm then eerie
-    title_calm = music_box_melody()
-    # Make "corrupted" version - detune slightly
-    corrupted = []
-    for freq, dur in [
-        (520, 0.4), (0, 0.1), (655, 0.3), (0, 0.1),
-        (590, 0.4), (0, 0.1), (518, 0.3), (0, 0.2),
-        (435, 0.5), (0, 0.1), (520, 0.3), (0, 0.1),
-        (590, 0.4), (0, 0.3),
-    ]:
-        if freq == 0:
-            corrupted.extend([0.0] * int(sr * dur))
-        else:
-            note = apply_envelope(gen_sine(freq, dur, 0.12), attack=0.02, release=0.08, sample_rate=sr)
-            corrupted.extend(note)
-    title_bgm = title_calm + corrupted * 2 + title_calm
-    write_wav(os.path.join(bgm_dir, "title.wav"), title_bgm, sr)
-
-    # Boss 1: Intense
-    def boss1_theme():
-        pattern = [
-            (220, 0.15), (0, 0.05), (220, 0.15), (0, 0.05),
-            (262, 0.15), (0, 0.05), (294, 0.15), (0, 0.05),
-            (330, 0.3), (0, 0.1),
-            (294, 0.15), (0, 0.05), (262, 0.15), (0, 0.05),
-            (220, 0.3), (0, 0.2),
-        ]
-        samples = []
-        for freq, dur in pattern:
-            if freq == 0:
-                samples.extend([0.0] * int(sr * dur))
-            else:
-                note = apply_envelope(gen_square(freq, dur, 0.2), attack=0.005, release=0.03, sample_rate=sr)
-                bass = apply_envelope(gen_sine(freq / 2, dur, 0.1), attack=0.005, release=0.03, sample_rate=sr)
-                samples.extend(mix(note, bass))
-        return samples
-
-    boss1 = boss1_theme() * 6
-    write_wav(os.path.join(bgm_dir, "boss_grimholt.wav"), boss1, sr)
-
-    # Boss 2: More ominous
-    def boss2_theme():
-        pattern = [
-            (196, 0.2), (0, 0.05), (233, 0.15), (0, 0.05),
-            (262, 0.2), (0, 0.05), (294, 0.15), (0, 0.1),
-            (349, 0.3), (0, 0.1), (330, 0.2), (0, 0.05),
-            (294, 0.15), (0, 0.05), (262, 0.3), (0, 0.3),
-        ]
-        samples = []
-        for freq, dur in pattern:
-            if freq == 0:
-                samples.extend([0.0] * int(sr * dur))
-            else:
-                note = apply_envelope(gen_square(freq, dur, 0.18), attack=0.005, release=0.03, sample_rate=sr)
-                sub = apply_envelope(gen_sine(freq / 3, dur, 0.12), attack=0.005, release=0.05, sample_rate=sr)
-                samples.extend(mix(note, sub))
-        return samples
-
-    boss2 = boss2_theme() * 6
-    noise_bg = apply_envelope(gen_noise(len(boss2) / sr, 0.02, sr), attack=0.5, sustain=0.8, release=0.5, sample_rate=sr)
-    boss2 = mix(boss2, noise_bg[:len(boss2)])
-    write_wav(os.path.join(bgm_dir, "boss_witch.wav"), boss2, sr)
+# Each track is one loop period; the WAV carries the loop points and the
+# game repeats it natively.
+BGM_SAMPLE_RATE = 22050
+BGM_LOOP_FADE = 0.25  # seconds of loop-boundary crossfade
+# Track name -> RMS dBFS it is normalized to (see audio.normalize); tracks
+# not listed keep their designed levels (the boss themes sit above the
+# stage music on purpose)
+BGM_RMS_DB = {}
+
+# Instruments (see audio.render_voice)
+MUSIC_BOX = Instrument((
+    Partial("sine", 0.15),
+    # Slight detuned harmonics for music box feel
+    Partial("sine", 0.05, mul=2),
+    Partial("sine", 0.02, mul=3),
+), Envelope(attack=0.01, release=0.05))
+SOFT_SINE = Instrument((Partial("sine", 0.1),), Envelope(attack=0.02, release=0.08))
+CORRUPTED_SINE = Instrument((Partial("sine", 0.12),), Envelope(attack=0.02, release=0.08))
+BOSS1_LEAD = Instrument((
+    Partial("square", 0.2),
+    Partial("sine", 0.1, div=2),  # bass
+), Envelope(attack=0.005, release=0.03))
+BOSS2_LEAD = Instrument((
+    Partial("square", 0.18),
+    Partial("sine", 0.12, div=3, envelope=Envelope(attack=0.005, release=0.05)),  # sub
+), Envelope(attack=0.005, release=0.03))
+
+# Patterns: (freq in Hz, seconds); freq 0 is a pause
+# Simple pentatonic melody
+MUSIC_BOX_MELODY = (
+    (523, 0.4), (0, 0.1), (659, 0.3), (0, 0.1),
+    (587, 0.4), (0, 0.1), (523, 0.3), (0, 0.2),
+    (440, 0.5), (0, 0.1), (523, 0.3), (0, 0.1),
+    (587, 0.4), (0, 0.3),
+    (523, 0.4), (0, 0.1), (440, 0.3), (0, 0.1),
+    (392, 0.5), (0, 0.1), (440, 0.3), (0, 0.1),
+    (523, 0.6), (0, 0.5),
+)
+# "Corrupted" version of the music box melody - detuned slightly
+CORRUPTED_MELODY = (
+    (520, 0.4), (0, 0.1), (655, 0.3), (0, 0.1),
+    (590, 0.4), (0, 0.1), (518, 0.3), (0, 0.2),
+    (435, 0.5), (0, 0.1), (520, 0.3), (0, 0.1),
+    (590, 0.4), (0, 0.3),
+)
+CEMETERY_MELODY = (
+    (330, 0.5), (0, 0.3), (294, 0.4), (0, 0.2),
+    (262, 0.6), (0, 0.3), (247, 0.4), (0, 0.2),
+    (220, 0.8), (0, 0.5),
+    (247, 0.4), (0, 0.2), (262, 0.5), (0, 0.3),
+    (220, 0.7), (0, 0.8),
+)
+BOSS1_PATTERN = (
+    (220, 0.15), (0, 0.05), (220, 0.15), (0, 0.05),
+    (262, 0.15), (0, 0.05), (294, 0.15), (0, 0.05),
+    (330, 0.3), (0, 0.1),
+    (294, 0.15), (0, 0.05), (262, 0.15), (0, 0.05),
+    (220, 0.3), (0, 0.2),
+)
+BOSS2_PATTERN = (
+    (196, 0.2), (0, 0.05), (233, 0.15), (0, 0.05),
+    (262, 0.2), (0, 0.05), (294, 0.15), (0, 0.1),
+    (349, 0.3), (0, 0.1), (330, 0.2), (0, 0.05),
+    (294, 0.15), (0, 0.05), (262, 0.3), (0, 0.3),
+)
+
+
+def _loop_track(parts, ambience=None):
+    """One seamless loop period of parts as a graph node.
+
+    The melody period loops as is (it starts and ends quietly).
+    ambience(duration) renders that many seconds of continuous
+    background: the period plus BGM_LOOP_FADE seconds of pre-roll that
+    LoopFade blends into its end, so the loop point is seamless. The mix
+    is limited once, by write_wav.
+    """
+    sr = BGM_SAMPLE_RATE
+    fade = int(sr * BGM_LOOP_FADE)
+    melody = Sequence(parts, sr)
+    n = melody.length
+    tracks = [melody]
+    if ambience is not None:
+        # Half a sample over, so int(sr * duration) gives back exactly n + fade
+        tracks.append(LoopFade(ambience((n + fade + 0.5) / sr), n, fade))
+    return Mixer(tracks, limit=None)
+
+
+def bgm_stage1_town():
+    # Dark music box melody over a subtle low drone
+    sr = BGM_SAMPLE_RATE
+    return _loop_track([(MUSIC_BOX, MUSIC_BOX_MELODY)],
+                       lambda duration: Sine(110, duration, 0.03, sr))
+
+
+def bgm_stage2_cemetery():
+    # Darker ambient, with wind noise
+    sr = BGM_SAMPLE_RATE
+    return _loop_track([(SOFT_SINE, CEMETERY_MELODY)],
+                       lambda duration: ADSR(Noise(duration, 0.04, sr), attack=0, sustain=0.8,
+                                      release=0, sample_rate=sr))
+
+
+def bgm_title():
+    # Calm then eerie: looping calm + corrupted * 2 plays calm, corrupted,
+    # corrupted, calm, ...
+    return _loop_track([
+        (MUSIC_BOX, MUSIC_BOX_MELODY),
+        (CORRUPTED_SINE, CORRUPTED_MELODY),
+        (CORRUPTED_SINE, CORRUPTED_MELODY),
+    ])
+
+
+def bgm_boss_grimholt():
+    # Intense
+    return _loop_track([(BOSS1_LEAD, BOSS1_PATTERN)])
+
+
+def bgm_boss_witch():
+    # More ominous
+    sr = BGM_SAMPLE_RATE
+    return _loop_track([(BOSS2_LEAD, BOSS2_PATTERN)],
+                       lambda duration: ADSR(Noise(duration, 0.02, sr), attack=0, sustain=0.8,
+                                      release=0, sample_rate=sr))
 
 
 # ============================================================
 # Main
 # ============================================================
 
-def main():
-    random.seed(42)
-
+PNG_JOBS = [
     # Ground tiles
-    print("Generating ground tiles...")
-    tile_dir = os.path.join(BASE_DIR, "assets", "tilesets")
-    write_png(os.path.join(tile_dir, "town_ground.png"), generate_town_tile())
-    write_png(os.path.join(tile_dir, "town_ground_b.png"), generate_town_tile_b())
-    write_png(os.path.join(tile_dir, "cemetery_ground.png"), generate_cemetery_tile())
-    write_png(os.path.join(tile_dir, "cemetery_ground_b.png"), generate_cemetery_tile_b())
-
-    # Decorations - Stage 1
-    print("Generating decorations...")
-    deco_dir = os.path.join(BASE_DIR, "assets", "decorations")
-    write_png(os.path.join(deco_dir, "twisted_tree.png"), generate_twisted_tree())
-    write_png(os.path.join(deco_dir, "broken_barrel.png"), generate_broken_barrel())
-    write_png(os.path.join(deco_dir, "lamp_post.png"), generate_lamp_post())
-    write_png(os.path.join(deco_dir, "blood_spot.png"), generate_blood_spot())
-    write_png(os.path.join(deco_dir, "well.png"), generate_well())
-    write_png(os.path.join(deco_dir, "cart.png"), generate_cart())
-
-    # Decorations - Stage 2
-    write_png(os.path.join(deco_dir, "gravestone_a.png"), generate_gravestone_a())
-    write_png(os.path.join(deco_dir, "gravestone_b.png"), generate_gravestone_b())
-    write_png(os.path.join(deco_dir, "dead_tree.png"), generate_dead_tree())
-    write_png(os.path.join(deco_dir, "iron_fence.png"), generate_iron_fence())
-    write_png(os.path.join(deco_dir, "skull.png"), generate_skull())
-    write_png(os.path.join(deco_dir, "mushroom_cluster.png"), generate_mushroom_cluster())
-    write_png(os.path.join(deco_dir, "broken_coffin.png"), generate_broken_coffin())
-
+    ("tilesets", [
+        ("town_ground.png", generate_town_tile),
+        ("town_ground_b.png", generate_town_tile_b),
+        ("cemetery_ground.png", generate_cemetery_tile),
+        ("cemetery_ground_b.png", generate_cemetery_tile_b),
+    ]),
+    # Decorations
+    ("decorations", [
+        # Stage 1
+        ("twisted_tree.png", generate_twisted_tree),
+        ("broken_barrel.png", generate_broken_barrel),
+        ("lamp_post.png", generate_lamp_post),
+        ("blood_spot.png", generate_blood_spot),
+        ("well.png", generate_well),
+        ("cart.png", generate_cart),
+        # Stage 2
+        ("gravestone_a.png", generate_gravestone_a),
+        ("gravestone_b.png", generate_gravestone_b),
+        ("dead_tree.png", generate_dead_tree),
+        ("iron_fence.png", generate_iron_fence),
+        ("skull.png", generate_skull),
+        ("mushroom_cluster.png", generate_mushroom_cluster),
+        ("broken_coffin.png", generate_broken_coffin),
+    ]),
     # Weapon icons
-    print("Generating weapon icons...")
-    icon_dir = os.path.join(BASE_DIR, "assets", "icons")
-    write_png(os.path.join(icon_dir, "weapon_scissors.png"), generate_weapon_icon_scissors())
-    write_png(os.path.join(icon_dir, "weapon_bible.png"), generate_weapon_icon_bible())
-    write_png(os.path.join(icon_dir, "weapon_candle.png"), generate_weapon_icon_candle())
-    write_png(os.path.join(icon_dir, "weapon_bouquet.png"), generate_weapon_icon_bouquet())
-    write_png(os.path.join(icon_dir, "weapon_needle.png"), generate_weapon_icon_needle())
-    write_png(os.path.join(icon_dir, "weapon_gear.png"), generate_weapon_icon_gear())
-    write_png(os.path.join(icon_dir, "weapon_mirror.png"), generate_weapon_icon_mirror())
-    write_png(os.path.join(icon_dir, "weapon_broom.png"), generate_weapon_icon_broom())
-
+    ("icons", [
+        ("weapon_scissors.png", generate_weapon_icon_scissors),
+        ("weapon_bible.png", generate_weapon_icon_bible),
+        ("weapon_candle.png", generate_weapon_icon_candle),
+        ("weapon_bouquet.png", generate_weapon_icon_bouquet),
+        ("weapon_needle.png", generate_weapon_icon_needle),
+        ("weapon_gear.png", generate_weapon_icon_gear),
+        ("weapon_mirror.png", generate_weapon_icon_mirror),
+        ("weapon_broom.png", generate_weapon_icon_broom),
+    ]),
     # Passive icons
-    print("Generating passive icons...")
-    write_png(os.path.join(icon_dir, "passive_apron.png"), generate_passive_icon_apron())
-    write_png(os.path.join(icon_dir, "passive_shoe.png"), generate_passive_icon_shoe())
-    write_png(os.path.join(icon_dir, "passive_clock.png"), generate_passive_icon_clock())
-    write_png(os.path.join(icon_dir, "passive_necklace.png"), generate_passive_icon_necklace())
-    write_png(os.path.join(icon_dir, "passive_magnifier.png"), generate_passive_icon_magnifier())
-    write_png(os.path.join(icon_dir, "passive_brooch.png"), generate_passive_icon_brooch())
-    write_png(os.path.join(icon_dir, "passive_diary.png"), generate_passive_icon_diary())
-    write_png(os.path.join(icon_dir, "passive_coin.png"), generate_passive_icon_coin())
-    write_png(os.path.join(icon_dir, "passive_herb.png"), generate_passive_icon_herb())
-    write_png(os.path.join(icon_dir, "passive_cloak.png"), generate_passive_icon_cloak())
-
+    ("icons", [
+        ("passive_apron.png", generate_passive_icon_apron),
+        ("passive_shoe.png", generate_passive_icon_shoe),
+        ("passive_clock.png", generate_passive_icon_clock),
+        ("passive_necklace.png", generate_passive_icon_necklace),
+        ("passive_magnifier.png", generate_passive_icon_magnifier),
+        ("passive_brooch.png", generate_passive_icon_brooch),
+        ("passive_diary.png", generate_passive_icon_diary),
+        ("passive_coin.png", generate_passive_icon_coin),
+        ("passive_herb.png", generate_passive_icon_herb),
+        ("passive_cloak.png", generate_passive_icon_cloak),
+    ]),
     # Effect textures
-    print("Generating effect textures...")
-    fx_dir = os.path.join(BASE_DIR, "assets", "fx")
-    write_png(os.path.join(fx_dir, "vignette.png"), generate_vignette())
-    write_png(os.path.join(fx_dir, "player_glow.png"), generate_player_glow())
-
-    # SFX
-    print("Generating SFX...")
-    generate_sfx()
-
-    # BGM
-    print("Generating BGM...")
-    generate_bgm()
-
-    print("Done! Generated:")
-    print("  - 4 ground tiles (32x32, 2 per stage)")
-    print("  - 13 decoration sprites")
-    print("  - 8 weapon icons (16x16)")
-    print("  - 10 passive icons (16x16)")
-    print("  - 19 SFX files")
-    print("  - 5 BGM tracks")
+    ("fx", [
+        ("vignette.png", generate_vignette),
+        ("player_glow.png", generate_player_glow),
+    ]),
+]
+
+
+# Sound effects
+SFX_JOBS = [
+    ("enemy_hit.wav", sfx_enemy_hit),
+    ("enemy_death.wav", sfx_enemy_death),
+    ("player_hit.wav", sfx_player_hit),
+    ("level_up.wav", sfx_level_up),
+    ("gem_pickup.wav", sfx_gem_pickup),
+    ("item_pickup.wav", sfx_item_pickup),
+    ("ui_select.wav", sfx_ui_select),
+    ("ui_confirm.wav", sfx_ui_confirm),
+    ("boss_warning.wav", sfx_boss_warning),
+    ("boss_death.wav", sfx_boss_death),
+    ("weapon_slash.wav", sfx_weapon_slash),
+    ("weapon_fire.wav", sfx_weapon_fire),
+    ("weapon_magic.wav", sfx_weapon_magic),
+    ("heal.wav", sfx_heal),
+    ("chest_open.wav", sfx_chest_open),
+    ("revive.wav", sfx_revive),
+    ("thunder.wav", sfx_thunder),
+    ("game_over.wav", sfx_game_over),
+    ("victory.wav", sfx_victory),
+]
+
+# Noise- and square-heavy effects that hold up at 8 bits (~37-39 dB SNR);
+# everything else stays 16-bit PCM
+SFX_FORMATS = {
+    "enemy_hit.wav": "pcm8",
+    "player_hit.wav": "pcm8",
+    "boss_warning.wav": "pcm8",
+    "boss_death.wav": "pcm8",
+    "weapon_slash.wav": "pcm8",
+    "weapon_fire.wav": "pcm8",
+    "chest_open.wav": "pcm8",
+    "thunder.wav": "pcm8",
+}
+
+# Background music, written as seamless loops
+BGM_JOBS = [
+    ("stage1_town.wav", bgm_stage1_town),
+    ("stage2_cemetery.wav", bgm_stage2_cemetery),
+    ("title.wav", bgm_title),
+    ("boss_grimholt.wav", bgm_boss_grimholt),
+    ("boss_witch.wav", bgm_boss_witch),
+]
+
+
+# Expected seconds per job, used for scheduling until real timings exist
+JOB_ESTIMATES = {
+    "fx/vignette.png": 1.0,
+    "audio/bgm/title.wav": 0.2,
+    "audio/bgm/stage2_cemetery.wav": 0.2,
+    "audio/bgm/stage1_town.wav": 0.1,
+}
+
+
+def _png_job(path, generate):
+    full_path = os.path.join(ASSETS_DIR, path)
+    return Job(path, generate, lambda: write_png(full_path, generate()),
+               JOB_ESTIMATES.get(path, 0.01))
+
+
+def _sfx_job(path, generate, fmt="pcm16"):
+    full_path = os.path.join(ASSETS_DIR, path)
+
+    def action():
+        samples = generate()
+        write_wav(full_path, samples, fmt=fmt)
+        if fmt != "pcm16":
+            size, ratio, snr = encoding_report(samples, fmt)
+            print(f"  {path}: {fmt}, {size} bytes ({ratio:.0%} of 16-bit), "
+                  f"SNR {snr:.1f} dB\n", end="", flush=True)
+    return Job(path, generate, action, JOB_ESTIMATES.get(path, 0.01), (fmt,))
+
+
+def _bgm_job(path, generate, rms_db=None):
+    full_path = os.path.join(ASSETS_DIR, path)
+
+    def action():
+        track = generate()
+        if rms_db is not None:
+            track = normalize(track, rms_db)
+        write_wav(full_path, track, BGM_SAMPLE_RATE, loop=(0, track.length))
+    return Job(path, generate, action, JOB_ESTIMATES.get(path, 0.01), (rms_db,))
+
+
+def asset_jobs():
+    jobs = [_png_job(f"{subdir}/{name}", generate)
+            for subdir, entries in PNG_JOBS for name, generate in entries]
+    jobs += [_sfx_job(f"audio/sfx/{name}", generate, SFX_FORMATS.get(name, "pcm16"))
+             for name, generate in SFX_JOBS]
+    jobs += [_bgm_job(f"audio/bgm/{name}", generate, BGM_RMS_DB.get(name))
+             for name, generate in BGM_JOBS]
+    return jobs
+
+
+def main():
+    build_assets.main(sys.argv[1:], generators=("generate_map_and_ui",))
 
 
 if __name__ == "__main__":
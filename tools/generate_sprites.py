@@ -4,143 +4,21 @@
 Generates all game sprites as PNG files following the GDD art style:
 "Blood-stained Storybook" - dark and eerie yet cute.
 
-Usage: python3 tools/generate_sprites.py
+Usage: python3 tools/generate_sprites.py [--jobs N] [--force]
+
+Sprites whose inputs are unchanged since the last run (see
+tools/manifest.py) are skipped; --force regenerates everything. The
+build itself is run by tools/build_assets.py.
 """
 import os
-import struct
-import zlib
+import sys
 import math
 
-
-# ============================================================
-# PNG Writer
-# ============================================================
-
-def write_png(filepath, canvas):
-    """Write a Canvas to a PNG file."""
-    w, h = canvas.w, canvas.h
-    raw = b""
-    for row in canvas.data:
-        raw += b"\x00"
-        for r, g, b, a in row:
-            raw += struct.pack("BBBB", r, g, b, a)
-    compressed = zlib.compress(raw, 9)
-
-    def chunk(ctype, cdata):
-        c = ctype + cdata
-        crc = struct.pack(">I", zlib.crc32(c) & 0xFFFFFFFF)
-        return struct.pack(">I", len(cdata)) + c + crc
-
-    sig = b"\x89PNG\r\n\x1a\n"
-    ihdr = struct.pack(">IIBBBBB", w, h, 8, 6, 0, 0, 0)
-    png = sig + chunk(b"IHDR", ihdr) + chunk(b"IDAT", compressed) + chunk(b"IEND", b"")
-
-    os.makedirs(os.path.dirname(filepath), exist_ok=True)
-    with open(filepath, "wb") as f:
-        f.write(png)
-
-
-# ============================================================
-# Canvas
-# ============================================================
-
-class Canvas:
-    def __init__(self, w, h):
-        self.w = w
-        self.h = h
-        self.data = [[(0, 0, 0, 0)] * w for _ in range(h)]
-
-    def set(self, x, y, color):
-        if 0 <= x < self.w and 0 <= y < self.h:
-            self.data[int(y)][int(x)] = color
-
-    def get(self, x, y):
-        if 0 <= x < self.w and 0 <= y < self.h:
-            return self.data[int(y)][int(x)]
-        return (0, 0, 0, 0)
-
-    def fill_rect(self, x, y, w, h, color):
-        for dy in range(h):
-            for dx in range(w):
-                self.set(x + dx, y + dy, color)
-
-    def fill_circle(self, cx, cy, r, color):
-        for y in range(-r, r + 1):
-            for x in range(-r, r + 1):
-                if x * x + y * y <= r * r:
-                    self.set(cx + x, cy + y, color)
-
-    def fill_ellipse(self, cx, cy, rx, ry, color):
-        for y in range(-ry, ry + 1):
-            for x in range(-rx, rx + 1):
-                fx = x / max(rx, 0.1)
-                fy = y / max(ry, 0.1)
-                if fx * fx + fy * fy <= 1.0:
-                    self.set(cx + x, cy + y, color)
-
-    def draw_line(self, x0, y0, x1, y1, color):
-        dx = abs(x1 - x0)
-        dy = -abs(y1 - y0)
-        sx = 1 if x0 < x1 else -1
-        sy = 1 if y0 < y1 else -1
-        err = dx + dy
-        while True:
-            self.set(x0, y0, color)
-            if x0 == x1 and y0 == y1:
-                break
-            e2 = 2 * err
-            if e2 >= dy:
-                err += dy
-                x0 += sx
-            if e2 <= dx:
-                err += dx
-                y0 += sy
-
-    def add_outline(self, color):
-        outline = []
-        for y in range(self.h):
-            for x in range(self.w):
-                if self.data[y][x][3] == 0:
-                    for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-                        nx, ny = x + dx, y + dy
-                        if 0 <= nx < self.w and 0 <= ny < self.h:
-                            if self.data[ny][nx][3] > 0:
-                                outline.append((x, y))
-                                break
-        for x, y in outline:
-            self.set(x, y, color)
-
-    def from_grid(self, grid, palette):
-        rows = grid.strip().split("\n")
-        for y, row in enumerate(rows):
-            for x, ch in enumerate(row):
-                if ch in palette:
-                    self.set(x, y, palette[ch])
-        return self
-
-    def copy(self):
-        c = Canvas(self.w, self.h)
-        for y in range(self.h):
-            for x in range(self.w):
-                c.data[y][x] = self.data[y][x]
-        return c
-
-    def scale(self, factor):
-        c = Canvas(self.w * factor, self.h * factor)
-        for y in range(self.h):
-            for x in range(self.w):
-                color = self.data[y][x]
-                for dy in range(factor):
-                    for dx in range(factor):
-                        c.set(x * factor + dx, y * factor + dy, color)
-        return c
-
-    def blit(self, other, ox, oy):
-        for y in range(other.h):
-            for x in range(other.w):
-                color = other.data[y][x]
-                if color[3] > 0:
-                    self.set(ox + x, oy + y, color)
+import build_assets
+from build_assets import ASSETS_DIR, Job
+from canvas import Canvas, IndexedSprite, Variant
+from png_writer import write_png
+from render_cache import cached
 
 
 # ============================================================
@@ -339,30 +217,6 @@ def lighten(color, factor=1.3):
             min(int(b * factor), 255), a)
 
 
-def add_aura(canvas, color, radius=1):
-    """Add glowing aura around non-transparent pixels."""
-    aura = []
-    for y in range(canvas.h):
-        for x in range(canvas.w):
-            if canvas.data[y][x][3] == 0:
-                found = False
-                for dy in range(-radius, radius + 1):
-                    for dx in range(-radius, radius + 1):
-                        if dx == 0 and dy == 0:
-                            continue
-                        nx, ny = x + dx, y + dy
-                        if 0 <= nx < canvas.w and 0 <= ny < canvas.h:
-                            if canvas.data[ny][nx][3] > 0:
-                                aura.append((x, y))
-                                found = True
-                                break
-                    if found:
-                        break
-    r, g, b, a = color
-    for x, y in aura:
-        canvas.set(x, y, (r, g, b, a // 2))
-
-
 # ============================================================
 # Character Sprites (24x24 sprite sheets, 2 frames = 48x24)
 # ============================================================
@@ -524,6 +378,7 @@ def make_fritz():
 # Enemy Sprites
 # ============================================================
 
+@cached
 def make_tooth_flower():
     """Tooth flower - carnivorous flower with teeth, 16x16."""
     c = Canvas(16, 16)
@@ -586,6 +441,7 @@ def make_shadow_cat():
     return c
 
 
+@cached
 def make_spider_doll():
     """Spider doll - stitched doll with spider legs, 16x16."""
     c = Canvas(16, 16)
@@ -617,6 +473,7 @@ def make_spider_doll():
     return c
 
 
+@cached
 def make_candle_ghost():
     """Candle ghost - floating spirit carrying a candle, 16x16."""
     c = Canvas(16, 16)
@@ -776,16 +633,12 @@ def make_root_hand():
 # Elite Sprites (24x24)
 # ============================================================
 
+ELITE_VARIANT = Variant(layers=(("aura", 2, BRIGHT_MAGENTA), ("outline", 1, BRIGHT_MAGENTA)))
+
+
 def _make_elite(base_func):
     """Create an elite version: place in 24x24 canvas with magenta aura."""
-    base = base_func()
-    c = Canvas(24, 24)
-    ox = (24 - base.w) // 2
-    oy = (24 - base.h) // 2
-    c.blit(base, ox, oy)
-    add_aura(c, BRIGHT_MAGENTA, radius=2)
-    c.add_outline(BRIGHT_MAGENTA)
-    return c
+    return IndexedSprite(base_func(), 24, 24).render(ELITE_VARIANT)
 
 
 def make_elite_tooth_flower():
@@ -1274,68 +1127,83 @@ def make_death_particle():
 # Main
 # ============================================================
 
-def main():
-    base = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    assets = os.path.join(base, "assets")
-
-    sprites = {
-        # Characters (24x24 sprite sheets, 2 frames = 48x24)
-        "characters/rosie.png": make_rosie(),
-        "characters/fritz.png": make_fritz(),
-
-        # Enemies (16x16)
-        "enemies/tooth_flower.png": make_tooth_flower(),
-        "enemies/shadow_cat.png": make_shadow_cat(),
-        "enemies/spider_doll.png": make_spider_doll(),
-        "enemies/candle_ghost.png": make_candle_ghost(),
-        "enemies/twisted_bread.png": make_twisted_bread(),
-        "enemies/bookworm.png": make_bookworm(),
-        "enemies/root_hand.png": make_root_hand(),
-        "enemies/mirror_ghost.png": make_mirror_ghost(),
-
-        # Elites (24x24)
-        "elites/elite_tooth_flower.png": make_elite_tooth_flower(),
-        "elites/elite_spider_doll.png": make_elite_spider_doll(),
-        "elites/elite_candle_ghost.png": make_elite_candle_ghost(),
-
-        # Bosses
-        "bosses/boss_grimholt.png": make_boss_grimholt(),
-        "bosses/boss_witch_messenger.png": make_boss_witch_messenger(),
-
-        # XP Gems (8x8)
-        "drops/xp_gem_small.png": make_gem_small(),
-        "drops/xp_gem_medium.png": make_gem_medium(),
-        "drops/xp_gem_large.png": make_gem_large(),
-
-        # Map Drops
-        "drops/heal_bread.png": make_heal_bread(),
-        "drops/magnet_charm.png": make_magnet_charm(),
-        "drops/purify_bell.png": make_purify_bell(),
-        "drops/gold_pouch.png": make_gold_pouch(),
-        "drops/treasure_chest.png": make_treasure_chest(),
-
-        # Weapon Projectiles
-        "weapons/proj_scissors.png": make_proj_scissors(),
-        "weapons/proj_bible.png": make_proj_bible(),
-        "weapons/proj_candle.png": make_proj_candle(),
-        "weapons/proj_bouquet.png": make_proj_bouquet(),
-        "weapons/proj_needle.png": make_proj_needle(),
-        "weapons/proj_gear.png": make_proj_gear(),
-        "weapons/proj_mirror.png": make_proj_mirror(),
-        "weapons/proj_broom.png": make_proj_broom(),
-
-        # Particles
-        "particles/death_particle.png": make_death_particle(),
-    }
+# Output path -> generator. Nothing is rendered here: build_assets.py calls
+# each generator only when its sprite is out of date, encodes and writes the
+# result, and drops the canvas before moving on.
+SPRITES = {
+    # Characters (24x24 sprite sheets, 2 frames = 48x24)
+    "characters/rosie.png": make_rosie,
+    "characters/fritz.png": make_fritz,
+
+    # Enemies (16x16)
+    "enemies/tooth_flower.png": make_tooth_flower,
+    "enemies/shadow_cat.png": make_shadow_cat,
+    "enemies/spider_doll.png": make_spider_doll,
+    "enemies/candle_ghost.png": make_candle_ghost,
+    "enemies/twisted_bread.png": make_twisted_bread,
+    "enemies/bookworm.png": make_bookworm,
+    "enemies/root_hand.png": make_root_hand,
+    "enemies/mirror_ghost.png": make_mirror_ghost,
+
+    # Bosses
+    "bosses/boss_grimholt.png": make_boss_grimholt,
+    "bosses/boss_witch_messenger.png": make_boss_witch_messenger,
+
+    # XP Gems (8x8)
+    "drops/xp_gem_small.png": make_gem_small,
+    "drops/xp_gem_medium.png": make_gem_medium,
+    "drops/xp_gem_large.png": make_gem_large,
+
+    # Map Drops
+    "drops/heal_bread.png": make_heal_bread,
+    "drops/magnet_charm.png": make_magnet_charm,
+    "drops/purify_bell.png": make_purify_bell,
+    "drops/gold_pouch.png": make_gold_pouch,
+    "drops/treasure_chest.png": make_treasure_chest,
+
+    # Weapon Projectiles
+    "weapons/proj_scissors.png": make_proj_scissors,
+    "weapons/proj_bible.png": make_proj_bible,
+    "weapons/proj_candle.png": make_proj_candle,
+    "weapons/proj_bouquet.png": make_proj_bouquet,
+    "weapons/proj_needle.png": make_proj_needle,
+    "weapons/proj_gear.png": make_proj_gear,
+    "weapons/proj_mirror.png": make_proj_mirror,
+    "weapons/proj_broom.png": make_proj_broom,
+
+    # Particles
+    "particles/death_particle.png": make_death_particle,
+}
+
+
+# Base sprite -> [(output path, generator)] of the sprites derived from it.
+# They are built in the base's job, so the base renders once (through the
+# render cache) whichever worker runs it.
+DERIVED_SPRITES = {
+    # Elites (24x24)
+    "enemies/tooth_flower.png": [("elites/elite_tooth_flower.png", make_elite_tooth_flower)],
+    "enemies/spider_doll.png": [("elites/elite_spider_doll.png", make_elite_spider_doll)],
+    "enemies/candle_ghost.png": [("elites/elite_candle_ghost.png", make_elite_candle_ghost)],
+}
+
+
+def _sprite_job(path, make, derived=()):
+    sprites = [(path, make)] + list(derived)
+
+    def action():
+        for out, make_out in sprites:
+            write_png(os.path.join(ASSETS_DIR, out), make_out())
+    return Job(path, make, action, 0.5 if path.startswith("bosses/") else 0.01,
+               tuple(x for pair in derived for x in pair))
+
+
+def asset_jobs():
+    return [_sprite_job(path, make, DERIVED_SPRITES.get(path, ()))
+            for path, make in SPRITES.items()]
 
-    count = 0
-    for path, canvas in sprites.items():
-        full_path = os.path.join(assets, path)
-        write_png(full_path, canvas)
-        count += 1
-        print(f"  [{count}/{len(sprites)}] {path} ({canvas.w}x{canvas.h})")
 
-    print(f"\nGenerated {count} sprites in {assets}/")
+def main():
+    build_assets.main(sys.argv[1:], generators=("generate_sprites",))
 
 
 if __name__ == "__main__":
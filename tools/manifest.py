@@ -0,0 +1,123 @@
+"""Incremental build manifest for the asset generators.
+
+assets/.gen_manifest.json records, for every generator job, a fingerprint
+of its inputs and the content hash of each file it produced:
+
+    {"jobs": {"enemies/tooth_flower.png": {
+        "inputs": "<sha256>", "outputs": {"enemies/tooth_flower.png": "<sha256>"},
+        "seconds": 0.004}}}
+
+The input fingerprint covers the generator's source, every same-module
+helper it calls (transitively), the module-level constants it reads (the
+palette colors), its arguments and a toolchain hash of the shared
+modules. A job is skipped when its fingerprint is unchanged and all its
+outputs still hash to the recorded values.
+
+Used by tools/build_assets.py.
+"""
+import hashlib
+import inspect
+import json
+import os
+import types
+
+import outputs
+
+
+MANIFEST_NAME = ".gen_manifest.json"
+MANIFEST_VERSION = 1
+
+_CONSTANT_TYPES = (int, float, str, bytes, tuple, frozenset)
+
+
+def _code_names(code):
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names |= _code_names(const)
+    return names
+
+
+def _hash_value(h, value, seen):
+    if isinstance(value, types.FunctionType):
+        _hash_function(h, value, seen)
+    else:
+        h.update(repr(value).encode())
+
+
+def _hash_function(h, func, seen):
+    func = inspect.unwrap(func)  # a decorated generator is hashed by its own code
+    if func in seen:
+        return
+    seen.add(func)
+    h.update(func.__qualname__.encode())
+    h.update(inspect.getsource(func).encode())
+    glb = func.__globals__
+    for name in sorted(_code_names(func.__code__)):
+        if name not in glb:
+            continue
+        value = glb[name]
+        if isinstance(value, types.FunctionType):
+            if value.__module__ == func.__module__:
+                _hash_function(h, value, seen)
+        elif isinstance(value, _CONSTANT_TYPES):
+            h.update(f"{name}={value!r}".encode())
+
+
+def toolchain_hash(*parts):
+    """Hash of shared modules (by source) and any other output settings."""
+    h = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, types.ModuleType):
+            h.update(inspect.getsource(part).encode())
+        else:
+            h.update(repr(part).encode())
+    return h.hexdigest()
+
+
+def fingerprint(func, args=(), toolchain=""):
+    """Input fingerprint of calling func(*args) under the given toolchain."""
+    h = hashlib.sha256(toolchain.encode())
+    seen = set()
+    _hash_function(h, func, seen)
+    for arg in args:
+        _hash_value(h, arg, seen)
+    return h.hexdigest()
+
+
+class Manifest:
+    def __init__(self, root, force=False):
+        self.root = root
+        self.path = os.path.join(root, MANIFEST_NAME)
+        self.force = force
+        self.jobs = {}
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION:
+                self.jobs = data["jobs"]
+        except (FileNotFoundError, ValueError, KeyError):
+            pass
+
+    def is_fresh(self, key, inputs):
+        """True when job key already produced its outputs from these inputs."""
+        entry = self.jobs.get(key)
+        if self.force or entry is None or entry["inputs"] != inputs:
+            return False
+        return all(outputs.file_hash(os.path.join(self.root, rel)) == digest
+                   for rel, digest in entry["outputs"].items())
+
+    def record(self, key, inputs, paths, seconds=None):
+        """Record the outputs of job key; seconds is kept for scheduling."""
+        self.jobs[key] = {
+            "inputs": inputs,
+            "outputs": {os.path.relpath(p, self.root): outputs.file_hash(p)
+                        for p in paths},
+        }
+        if seconds is not None:
+            self.jobs[key]["seconds"] = round(seconds, 3)
+
+    def save(self):
+        data = {"version": MANIFEST_VERSION, "jobs": self.jobs}
+        text = json.dumps(data, indent=1, sort_keys=True) + "\n"
+        outputs.write_if_changed(self.path, text.encode(), count=False)
@@ -0,0 +1,149 @@
+"""Atomic, write-if-changed output for generated assets.
+
+Every PNG and WAV goes through write_if_changed(): the new content hash is
+compared with the file already on disk and identical outputs are left
+untouched, so their mtimes stay put and Godot does not re-import them.
+Changed files are written to a temp file in the same directory and moved
+into place with os.replace().
+
+Inside ``with capture() as files:`` nothing is written; (path, bytes)
+pairs are collected instead so a worker process can hand them to a
+single writer (see tools/build_assets.py). With capture(spool=True),
+chunked data (long WAVs) is streamed to a temp file beside its
+destination instead and collected as (path, Spooled); write_if_changed()
+then moves that file into place, so the track is never held in memory
+as one bytes object or pickled between processes.
+
+Used by tools/png_writer.py and tools/wav_writer.py.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+from collections import namedtuple
+from contextlib import contextmanager
+
+
+NEW = "new"
+WRITTEN = "written"
+UNCHANGED = "unchanged"
+SKIPPED = "skipped"
+
+
+class WriteStats:
+    """Counts of written, unchanged, new and skipped files for one run."""
+
+    def __init__(self):
+        self.counts = {WRITTEN: 0, UNCHANGED: 0, NEW: 0, SKIPPED: 0}
+
+    def add(self, status, n=1):
+        self.counts[status] += n
+
+    def summary(self):
+        return ", ".join(f"{n} {status}" for status, n in self.counts.items())
+
+
+# Captured chunked output: a temp file next to its destination and its sha256
+Spooled = namedtuple("Spooled", "tmp digest")
+
+stats = WriteStats()
+_captured = None
+_spool = False
+
+
+@contextmanager
+def capture(spool=False):
+    """Collect (path, bytes) instead of writing, for the duration of the block.
+
+    With spool set, chunked data is collected as (path, Spooled).
+    """
+    global _captured, _spool
+    outer, (_captured, _spool) = (_captured, _spool), ([], spool)
+    try:
+        yield _captured
+    finally:
+        _captured, _spool = outer
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_hash(path):
+    """sha256 of the file at path, or None if it does not exist."""
+    h = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 16), b""):
+                h.update(block)
+    except FileNotFoundError:
+        return None
+    return h.hexdigest()
+
+
+def _umask():
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+def write_if_changed(path, data, count=True):
+    """Write data (bytes, or an iterable of byte chunks) to path atomically.
+
+    Returns NEW, WRITTEN or UNCHANGED and, when count is set, records it
+    in ``stats``. Returns None while capturing.
+    """
+    if _captured is not None:
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            data = bytes(data)
+        elif _spool:
+            data = Spooled(*_write_temp(path, data))
+        else:
+            data = b"".join(data)
+        _captured.append((path, data))
+        return None
+    status = _write_if_changed(path, data)
+    if count:
+        stats.add(status)
+    return status
+
+
+def _write_temp(path, chunks):
+    """Stream chunks to a temp file beside path; returns (temp path, sha256)."""
+    dirname = os.path.dirname(path) or "."
+    os.makedirs(dirname, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=dirname, prefix="." + os.path.basename(path),
+                               suffix=".tmp")
+    try:
+        h = hashlib.sha256()
+        with os.fdopen(fd, "wb") as f:
+            for block in chunks:
+                h.update(block)
+                f.write(block)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return tmp, h.hexdigest()
+
+
+def _write_if_changed(path, data):
+    old = file_hash(path)
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        if old is not None and old == content_hash(data):
+            return UNCHANGED
+        data = (data,)
+    tmp, digest = data if isinstance(data, Spooled) else _write_temp(path, data)
+    try:
+        if old is not None and old == digest:
+            os.unlink(tmp)
+            return UNCHANGED
+        if old is not None:
+            shutil.copymode(path, tmp)
+        else:
+            os.chmod(tmp, 0o666 & ~_umask())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    return NEW if old is None else WRITTEN
@@ -0,0 +1,399 @@
+"""Streaming PNG encoder for Canvas images.
+
+Scanlines are fed straight from the canvas buffer into a
+``zlib.compressobj`` and compressed data is emitted as IDAT chunks of at
+most IDAT_CHUNK_SIZE bytes, so the uncompressed image is never assembled
+in memory.
+
+Each scanline gets one of the five PNG filters (None, Sub, Up, Average,
+Paeth). The "adaptive" mode picks, per row, the filter with the minimum
+sum of absolute differences (filtered bytes read as signed). That
+heuristic often loses to no filtering at all on small flat-colored
+sprites, so the default "smallest" mode encodes the image both ways and
+keeps the smaller file; "brute" tries every strategy. PNG_FILTER=<mode>
+overrides the mode used by write_png.
+
+Images with at most 256 distinct RGBA values can be written as indexed
+color (color type 3) with PLTE and tRNS chunks at 1/2/4/8-bit depth.
+Palette rows are never filtered, as the PNG spec recommends. The default
+"auto" color mode encodes such images both indexed and as 8-bit RGBA and
+keeps the smaller file; anything else is RGBA. PNG_COLOR=rgba|indexed|auto
+overrides the color mode used by write_png.
+
+The whole-image modes ("smallest", "brute", color "auto") encode in
+memory; the explicit ones stream.
+
+Run this module with a directory to get a size report:
+
+    python3 tools/png_writer.py assets
+
+Used by tools/generate_sprites.py and tools/generate_map_and_ui.py.
+"""
+import os
+import struct
+import sys
+import zlib
+
+from canvas import np
+from outputs import write_if_changed
+
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+IDAT_CHUNK_SIZE = 1 << 16
+
+COLOR_TYPE_INDEXED = 3
+COLOR_TYPE_RGBA = 6
+MAX_PALETTE = 256
+
+FILTER_NONE, FILTER_SUB, FILTER_UP, FILTER_AVERAGE, FILTER_PAETH = range(5)
+FIXED_FILTERS = {
+    "none": FILTER_NONE, "sub": FILTER_SUB, "up": FILTER_UP,
+    "average": FILTER_AVERAGE, "paeth": FILTER_PAETH,
+}
+# Whole-image modes: encode with each of these row strategies, keep the smallest
+MULTI_FILTER_MODES = {
+    "smallest": ("none", "adaptive"),
+    "brute": ("adaptive",) + tuple(FIXED_FILTERS),
+}
+FILTER_MODES = ("adaptive",) + tuple(MULTI_FILTER_MODES) + tuple(FIXED_FILTERS)
+COLOR_MODES = ("auto", "rgba", "indexed")
+DEFAULT_FILTER_MODE = os.environ.get("PNG_FILTER", "smallest")
+DEFAULT_COLOR_MODE = os.environ.get("PNG_COLOR", "auto")
+
+
+def _chunk(ctype, cdata):
+    crc = zlib.crc32(cdata, zlib.crc32(ctype)) & 0xFFFFFFFF
+    return struct.pack(">I", len(cdata)) + ctype + cdata + struct.pack(">I", crc)
+
+
+# ============================================================
+# Row filters
+# ============================================================
+
+def _paeth(a, b, c):
+    p = a + b - c
+    pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+    if pa <= pb and pa <= pc:
+        return a
+    if pb <= pc:
+        return b
+    return c
+
+
+def _filter_row(ftype, row, prev, bpp):
+    """Apply one PNG filter to row (bytes); prev is the raw row above."""
+    if ftype == FILTER_NONE:
+        return bytes(row)
+    left = bytes(bpp) + bytes(row[:-bpp])
+    if ftype == FILTER_SUB:
+        return bytes((x - a) & 0xFF for x, a in zip(row, left))
+    if ftype == FILTER_UP:
+        return bytes((x - b) & 0xFF for x, b in zip(row, prev))
+    if ftype == FILTER_AVERAGE:
+        return bytes((x - ((a + b) >> 1)) & 0xFF for x, a, b in zip(row, left, prev))
+    upleft = bytes(bpp) + bytes(prev[:-bpp])
+    return bytes((x - _paeth(a, b, c)) & 0xFF
+                 for x, a, b, c in zip(row, left, prev, upleft))
+
+
+def _np_filter_rows(row, prev, bpp):
+    """All five filtered versions of row as a (5, stride) uint8 array."""
+    x = np.frombuffer(row, dtype=np.uint8).astype(np.int16)
+    b = np.frombuffer(prev, dtype=np.uint8).astype(np.int16)
+    a = np.zeros_like(x)
+    a[bpp:] = x[:-bpp]
+    c = np.zeros_like(x)
+    c[bpp:] = b[:-bpp]
+    p = a + b - c
+    pa, pb, pc = np.abs(p - a), np.abs(p - b), np.abs(p - c)
+    pred = np.where((pa <= pb) & (pa <= pc), a, np.where(pb <= pc, b, c))
+    out = np.stack([x, x - a, x - b, x - ((a + b) >> 1), x - pred])
+    return (out & 0xFF).astype(np.uint8)
+
+
+def _signed_cost(data):
+    return sum(v if v < 128 else 256 - v for v in data)
+
+
+def _select_filter(row, prev, mode, bpp):
+    """Return the filter byte plus filtered row for one scanline."""
+    if mode == "adaptive":
+        if np is not None:
+            cands = _np_filter_rows(row, prev, bpp)
+            cost = np.minimum(cands, 256 - cands.astype(np.int16)).sum(axis=1)
+            best = int(np.argmin(cost))
+            return best, cands[best].tobytes()
+        best, best_data, best_cost = 0, None, None
+        for ftype in range(5):
+            data = _filter_row(ftype, row, prev, bpp)
+            cost = _signed_cost(data)
+            if best_cost is None or cost < best_cost:
+                best, best_data, best_cost = ftype, data, cost
+        return best, best_data
+    ftype = FIXED_FILTERS[mode]
+    if ftype == FILTER_NONE:
+        return FILTER_NONE, row
+    return ftype, _filter_row(ftype, row, prev, bpp)
+
+
+# ============================================================
+# Palette
+# ============================================================
+
+def _pixel_keys(canvas):
+    """Pixels as native-endian uint32 keys (a memoryview or NumPy array)."""
+    if np is not None:
+        return np.frombuffer(canvas.buf, dtype=np.uint32)
+    return memoryview(canvas.buf).cast("I")
+
+
+def _key_alpha(key):
+    return key.to_bytes(4, sys.byteorder)[3]
+
+
+def build_palette(canvas, max_colors=MAX_PALETTE):
+    """Distinct colors of canvas as uint32 keys, or None if there are too many.
+
+    Translucent entries come first so the tRNS chunk stays short; within
+    each group colors keep their first-appearance order.
+    """
+    keys = _pixel_keys(canvas)
+    if np is not None:
+        uniq, first = np.unique(keys, return_index=True)
+        if len(uniq) > max_colors:
+            return None
+        ordered = [int(k) for k in uniq[np.argsort(first)]]
+    else:
+        seen = {}
+        for k in keys:
+            if k not in seen:
+                if len(seen) == max_colors:
+                    return None
+                seen[k] = None
+        ordered = list(seen)
+    return sorted(ordered, key=lambda k: _key_alpha(k) == 255)
+
+
+def _bit_depth(ncolors):
+    for depth in (1, 2, 4):
+        if ncolors <= 1 << depth:
+            return depth
+    return 8
+
+
+def _pack_indices(indices, depth):
+    """Pack a sequence of palette indices into a scanline at depth bits."""
+    if depth == 8:
+        return bytes(indices)
+    per = 8 // depth
+    out = bytearray()
+    for i in range(0, len(indices), per):
+        group = indices[i:i + per]
+        v = 0
+        for idx in group:
+            v = (v << depth) | idx
+        out.append(v << (depth * (per - len(group))))
+    return bytes(out)
+
+
+def _indexed_rows(canvas, palette, depth):
+    """Yield packed palette-index scanlines for canvas."""
+    w = canvas.w
+    keys = _pixel_keys(canvas)
+    if np is not None:
+        pal = np.array(palette, dtype=np.uint32)
+        order = np.argsort(pal)
+        sorted_pal = pal[order]
+        per = 8 // depth
+        shifts = (depth * np.arange(per - 1, -1, -1)).astype(np.uint8)
+        for y in range(canvas.h):
+            idx = order[np.searchsorted(sorted_pal, keys[y * w:(y + 1) * w])]
+            idx = idx.astype(np.uint8)
+            if depth == 8:
+                yield idx.tobytes()
+                continue
+            pad = -len(idx) % per
+            if pad:
+                idx = np.concatenate([idx, np.zeros(pad, dtype=np.uint8)])
+            packed = (idx.reshape(-1, per) << shifts).sum(axis=1, dtype=np.uint16)
+            yield packed.astype(np.uint8).tobytes()
+        return
+    lut = {k: i for i, k in enumerate(palette)}
+    for y in range(canvas.h):
+        yield _pack_indices([lut[k] for k in keys[y * w:(y + 1) * w]], depth)
+
+
+def _rgba_rows(canvas):
+    rows = memoryview(canvas.buf)
+    stride = canvas.stride
+    for y in range(canvas.h):
+        yield rows[y * stride:(y + 1) * stride]
+
+
+# ============================================================
+# Encoder
+# ============================================================
+
+def iter_png(canvas, level=9, filter_mode=None, color_mode=None):
+    """Yield the PNG file for canvas piece by piece."""
+    filter_mode = filter_mode or DEFAULT_FILTER_MODE
+    color_mode = color_mode or DEFAULT_COLOR_MODE
+    if filter_mode not in FILTER_MODES:
+        raise ValueError(f"unknown PNG filter mode: {filter_mode}")
+    if color_mode not in COLOR_MODES:
+        raise ValueError(f"unknown PNG color mode: {color_mode}")
+    if color_mode == "auto" or (filter_mode in MULTI_FILTER_MODES and color_mode == "rgba"):
+        yield encode_png(canvas, level, filter_mode, color_mode)
+        return
+
+    w, h = canvas.w, canvas.h
+    palette = build_palette(canvas) if color_mode == "indexed" else None
+    if palette is None and color_mode == "indexed":
+        raise ValueError(f"image has more than {MAX_PALETTE} colors")
+
+    yield PNG_SIGNATURE
+    if palette is not None:
+        depth = _bit_depth(len(palette))
+        yield _chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, depth,
+                                          COLOR_TYPE_INDEXED, 0, 0, 0))
+        entries = [k.to_bytes(4, sys.byteorder) for k in palette]
+        yield _chunk(b"PLTE", b"".join(e[:3] for e in entries))
+        alphas = bytes(e[3] for e in entries).rstrip(b"\xff")
+        if alphas:
+            yield _chunk(b"tRNS", alphas)
+        rows, bpp = _indexed_rows(canvas, palette, depth), 1
+        stride = (w * depth + 7) // 8
+        filter_mode = "none"
+    else:
+        yield _chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8,
+                                          COLOR_TYPE_RGBA, 0, 0, 0))
+        rows, bpp = _rgba_rows(canvas), 4
+        stride = canvas.stride
+
+    comp = zlib.compressobj(level)
+    pending = bytearray()
+    prev = bytes(stride)
+    for row in rows:
+        ftype, data = _select_filter(row, prev, filter_mode, bpp)
+        pending += comp.compress(bytes((ftype,)))
+        pending += comp.compress(data)
+        prev = row
+        while len(pending) >= IDAT_CHUNK_SIZE:
+            yield _chunk(b"IDAT", bytes(pending[:IDAT_CHUNK_SIZE]))
+            del pending[:IDAT_CHUNK_SIZE]
+    pending += comp.flush()
+    for i in range(0, len(pending), IDAT_CHUNK_SIZE):
+        yield _chunk(b"IDAT", bytes(pending[i:i + IDAT_CHUNK_SIZE]))
+    yield _chunk(b"IEND", b"")
+
+
+def encode_png(canvas, level=9, filter_mode=None, color_mode=None):
+    """Return the PNG file for canvas as bytes."""
+    filter_mode = filter_mode or DEFAULT_FILTER_MODE
+    color_mode = color_mode or DEFAULT_COLOR_MODE
+    if color_mode == "auto":
+        candidates = [encode_png(canvas, level, filter_mode, "rgba")]
+        if build_palette(canvas) is not None:
+            candidates.insert(0, encode_png(canvas, level, "none", "indexed"))
+        return min(candidates, key=len)
+    if filter_mode in MULTI_FILTER_MODES and color_mode == "rgba":
+        return min((encode_png(canvas, level, m, color_mode)
+                    for m in MULTI_FILTER_MODES[filter_mode]), key=len)
+    return b"".join(iter_png(canvas, level, filter_mode, color_mode))
+
+
+def write_png(filepath, canvas, filter_mode=None, color_mode=None):
+    """Write a Canvas to a PNG file unless it is already up to date.
+
+    Returns the outputs.write_if_changed() status.
+    """
+    return write_if_changed(filepath, encode_png(canvas, filter_mode=filter_mode,
+                                                 color_mode=color_mode))
+
+
+# ============================================================
+# Decoder (for reports)
+# ============================================================
+
+def read_png(filepath):
+    """Read a non-interlaced 8-bit RGBA or indexed PNG into a Canvas."""
+    from canvas import Canvas
+
+    with open(filepath, "rb") as f:
+        data = f.read()
+    if data[:8] != PNG_SIGNATURE:
+        raise ValueError(f"{filepath}: not a PNG file")
+    pos, idat, plte, trns = 8, bytearray(), b"", b""
+    w = h = depth = color_type = 0
+    while pos < len(data):
+        length, ctype = struct.unpack(">I4s", data[pos:pos + 8])
+        body = data[pos + 8:pos + 8 + length]
+        if ctype == b"IHDR":
+            w, h, depth, color_type = struct.unpack(">IIBB", body[:10])
+        elif ctype == b"PLTE":
+            plte = body
+        elif ctype == b"tRNS":
+            trns = body
+        elif ctype == b"IDAT":
+            idat += body
+        pos += 12 + length
+    if (depth, color_type) != (8, COLOR_TYPE_RGBA) and color_type != COLOR_TYPE_INDEXED:
+        raise ValueError(f"{filepath}: only 8-bit RGBA and indexed PNGs are supported")
+
+    raw = zlib.decompress(bytes(idat))
+    c = Canvas(w, h)
+    if color_type == COLOR_TYPE_RGBA:
+        bpp, stride = 4, c.stride
+    else:
+        bpp, stride = 1, (w * depth + 7) // 8
+        colors = [plte[i * 3:i * 3 + 3] + bytes((trns[i] if i < len(trns) else 255,))
+                  for i in range(len(plte) // 3)]
+    prev = bytearray(stride)
+    for y in range(h):
+        base = y * (stride + 1)
+        ftype = raw[base]
+        row = bytearray(raw[base + 1:base + 1 + stride])
+        for i in range(stride):
+            a = row[i - bpp] if i >= bpp else 0
+            b = prev[i]
+            if ftype == FILTER_SUB:
+                row[i] = (row[i] + a) & 0xFF
+            elif ftype == FILTER_UP:
+                row[i] = (row[i] + b) & 0xFF
+            elif ftype == FILTER_AVERAGE:
+                row[i] = (row[i] + ((a + b) >> 1)) & 0xFF
+            elif ftype == FILTER_PAETH:
+                cc = prev[i - bpp] if i >= bpp else 0
+                row[i] = (row[i] + _paeth(a, b, cc)) & 0xFF
+        if color_type == COLOR_TYPE_RGBA:
+            c.buf[y * c.stride:(y + 1) * c.stride] = row
+        else:
+            per, mask = 8 // depth, (1 << depth) - 1
+            for x in range(w):
+                shift = depth * (per - 1 - x % per)
+                c.set(x, y, colors[(row[x // per] >> shift) & mask])
+        prev = row
+    return c
+
+
+def size_report(root, filter_mode=None, color_mode=None):
+    """Print bytes saved per PNG under root versus unfiltered RGBA encoding."""
+    total_old = total_new = 0
+    for dirpath, _, files in sorted(os.walk(root)):
+        for name in sorted(files):
+            if not name.endswith(".png"):
+                continue
+            path = os.path.join(dirpath, name)
+            canvas = read_png(path)
+            old = len(encode_png(canvas, filter_mode="none", color_mode="rgba"))
+            new = len(encode_png(canvas, filter_mode=filter_mode, color_mode=color_mode))
+            total_old += old
+            total_new += new
+            print(f"  {os.path.relpath(path, root):40s} {old:7d} -> {new:7d}"
+                  f"  ({old - new:+d} bytes)")
+    print(f"\nTotal: {total_old} -> {total_new} bytes"
+          f" ({total_old - total_new:+d} saved)")
+
+
+if __name__ == "__main__":
+    size_report(*(sys.argv[1:] or ["assets"]))
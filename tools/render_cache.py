@@ -0,0 +1,89 @@
+"""Memoized, immutable renders shared within one build process.
+
+A generator decorated with @cached renders once per process for each
+set of arguments, and every caller gets a snapshot of that one render:
+
+- a Canvas comes back as a copy-on-write canvas (Canvas.snapshot()) that
+  shares the cached pixels; drawing on it copies them first, so the
+  cached render never changes;
+- an audio buffer comes back as a read-only memoryview (array("d", ...)
+  makes a mutable copy).
+
+Misses render inside an asset scope of their own (see rng_streams), so
+a cached render is the same whichever asset asks for it first, and
+derived assets (elites, sequenced notes) reuse base renders instead of
+recomputing them.
+
+Hits and misses are counted per generator; tools/build_assets.py
+collects them from every job with take_stats() and prints the summary
+at the end of the build.
+
+Used by tools/generate_sprites.py and tools/audio.py.
+"""
+import functools
+from array import array
+
+import rng_streams
+from canvas import Canvas
+
+
+class CacheStats:
+    """Hits and misses per cached generator."""
+
+    def __init__(self):
+        self.counts = {}  # name -> [hits, misses]
+
+    def add(self, name, hit):
+        counts = self.counts.setdefault(name, [0, 0])
+        counts[0 if hit else 1] += 1
+
+    def merge(self, other):
+        for name, (hits, misses) in other.counts.items():
+            counts = self.counts.setdefault(name, [0, 0])
+            counts[0] += hits
+            counts[1] += misses
+
+    def summary(self):
+        hits = sum(c[0] for c in self.counts.values())
+        misses = sum(c[1] for c in self.counts.values())
+        detail = ", ".join(f"{name} {h}/{m}" for name, (h, m) in sorted(self.counts.items()))
+        return f"{hits} hits, {misses} misses" + (f" ({detail})" if detail else "")
+
+
+stats = CacheStats()
+_renders = {}  # (module, qualname, args, kwargs) -> frozen render
+
+
+def take_stats():
+    """The counts since the last call, which start again from zero."""
+    global stats
+    taken, stats = stats, CacheStats()
+    return taken
+
+
+def _freeze(value):
+    if isinstance(value, Canvas):
+        return value.snapshot()
+    if isinstance(value, array):
+        return memoryview(value).toreadonly()
+    return value
+
+
+def _snapshot(value):
+    return value.snapshot() if isinstance(value, Canvas) else value
+
+
+def cached(func):
+    """Memoize func by its arguments, handing out immutable snapshots."""
+    name = func.__qualname__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        key = (func.__module__, name, args, tuple(sorted(kwargs.items())))
+        value = _renders.get(key)
+        stats.add(name, value is not None)
+        if value is None:
+            with rng_streams.asset_scope(f"render:{func.__module__}.{name}{key[2:]!r}"):
+                value = _renders[key] = _freeze(func(*args, **kwargs))
+        return _snapshot(value)
+    return wrapper
@@ -0,0 +1,46 @@
+"""Deterministic per-asset random streams.
+
+Randomness in a generator must not depend on what ran before it in the
+same process, otherwise selective, incremental and parallel builds
+render differently from a full serial run. Instead of the global
+``random`` module, generators draw from stream(name): a
+``random.Random`` seeded from the identity of the asset being built
+(set by asset_scope(), which tools/build_assets.py enters around every
+job), the stream name and how many times that name has been requested
+within the asset.
+
+Outside any asset scope, stream(name) is seeded from the name alone.
+"""
+import hashlib
+import random
+from contextlib import contextmanager
+
+
+_scope = None  # (asset identity, {stream name: uses so far})
+
+
+def derive_seed(*parts):
+    """Stable 64-bit seed from any number of str()-able parts."""
+    digest = hashlib.sha256("\x1f".join(str(p) for p in parts).encode()).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+@contextmanager
+def asset_scope(identity):
+    """Make identity the asset that stream() derives its seeds from."""
+    global _scope
+    outer, _scope = _scope, (identity, {})
+    try:
+        yield
+    finally:
+        _scope = outer
+
+
+def stream(name):
+    """New random.Random for the next use of name in the current asset."""
+    if _scope is None:
+        return random.Random(derive_seed(name))
+    identity, uses = _scope
+    n = uses.get(name, 0)
+    uses[name] = n + 1
+    return random.Random(derive_seed(identity, name, n))
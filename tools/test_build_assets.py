@@ -0,0 +1,62 @@
+"""Determinism checks for the asset build.
+
+A fast subset of build_assets.py --verify-determinism: jobs that draw
+random noise must render the same bytes alone in a fresh process as after
+other noisy jobs in the same process, and changing how seeds are derived
+must change their fingerprints so the manifest rebuilds them.
+
+Usage: python3 tools/test_build_assets.py (or python3 -m pytest tools)
+"""
+import importlib.util
+import inspect
+import os
+import sys
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import build_assets  # noqa: E402
+import manifest  # noqa: E402
+import rng_streams  # noqa: E402
+
+
+GENERATOR = "generate_map_and_ui"
+NOISY_JOB = "audio/sfx/thunder.wav"
+OTHER_NOISY_JOBS = ("audio/sfx/weapon_slash.wav", "audio/sfx/player_hit.wav",
+                    "audio/bgm/stage2_cemetery.wav")
+
+
+class DeterminismTest(unittest.TestCase):
+    def test_noisy_job_independent_of_build_order(self):
+        for key in OTHER_NOISY_JOBS:
+            build_assets._run_job(GENERATOR, key)
+        after_others = build_assets._run_job(GENERATOR, NOISY_JOB)[0]
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            alone = pool.submit(build_assets._run_job, GENERATOR, NOISY_JOB).result()[0]
+        self.assertTrue(after_others)
+        self.assertEqual(alone, after_others)
+
+    def test_seed_derivation_changes_fingerprint(self):
+        job = next(j for j in build_assets._module_jobs(GENERATOR) if j.key == NOISY_JOB)
+        before = manifest.fingerprint(job.func, job.args, build_assets.default_toolchain())
+        source = inspect.getsource(rng_streams)
+        changed = source.replace('"\\x1f".join', '"\\x1e".join')
+        self.assertNotEqual(changed, source)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "rng_streams.py")
+            with open(path, "w") as f:
+                f.write(changed)
+            spec = importlib.util.spec_from_file_location("rng_streams", path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            with mock.patch.object(build_assets, "rng_streams", module):
+                after = manifest.fingerprint(job.func, job.args,
+                                             build_assets.default_toolchain())
+        self.assertNotEqual(after, before)
+
+
+if __name__ == "__main__":
+    unittest.main()
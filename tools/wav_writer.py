@@ -0,0 +1,294 @@
+"""Mono WAV encoder for sample buffers.
+
+Samples (floats, -1.0 to 1.0) are clamped and converted to ``int16`` a
+block of WAV_CHUNK_SAMPLES at a time, truncating toward zero exactly like
+``int(s * 32767)``. iter_wav() yields the header and then one ``bytes``
+chunk per block. write_wav() normally joins them and hands the file to
+outputs.write_if_changed() in one piece (an unchanged file is then left
+alone without touching the disk); with chunked=True the blocks are
+streamed to the temp file instead, so a long track is never held as one
+big bytes object on top of its samples. An audio.Node is rendered and
+written one block at a time, so its samples are never materialized.
+
+A loop=(begin, end) region (in samples, end exclusive) is stored as a
+``smpl`` chunk, and write_wav() also sets the matching loop settings in
+the Godot ``.import`` file next to the WAV when one exists, so the
+stream loops natively in the game (and resets them when written without
+a loop).
+
+Besides the default 16-bit PCM, fmt="pcm8" writes unsigned 8-bit PCM
+and fmt="ima_adpcm" 4-bit IMA-ADPCM (format tag 0x11, with a fact chunk).
+Godot's WAV importer only reads PCM, so generated game assets use pcm8
+for effects that tolerate it; write_wav() then sets the .import params
+in GODOT_IMPORT_PARAMS so Godot keeps the file as is instead of
+re-encoding it (and restores the pcm16 defaults when a file goes back
+to pcm16). encoding_report() gives the size and signal-to-noise
+ratio of any format for a set of samples.
+
+Uses NumPy for the conversion when available (see tools/canvas.py).
+
+Used by tools/generate_map_and_ui.py.
+"""
+import math
+import os
+import re
+import struct
+import sys
+from array import array
+
+from audio import Node
+from canvas import np
+from outputs import write_if_changed
+
+
+WAV_CHUNK_SAMPLES = 1 << 16
+PCM_MAX = 32767
+
+FORMATS = ("pcm16", "pcm8", "ima_adpcm")
+FORMAT_TAG_PCM = 1
+FORMAT_TAG_IMA_ADPCM = 0x11
+
+# Godot's AudioStreamWAV import setting edit/loop_mode
+GODOT_LOOP_FORWARD = 2
+# .import loop params of a WAV written without a loop (Godot's defaults)
+GODOT_NO_LOOP = {"edit/loop_mode": 0, "edit/loop_begin": 0, "edit/loop_end": -1}
+# .import params matching each encoding: pcm8 is kept as is instead of
+# re-encoded (compress/mode=0 is "Disabled"); pcm16 gets the project's
+# defaults back, so a file moved off pcm8 is not downconverted
+GODOT_IMPORT_PARAMS = {
+    "pcm16": {"force/8_bit": "false", "compress/mode": 2},
+    "pcm8": {"force/8_bit": "true", "compress/mode": 0},
+}
+
+IMA_STEPS = (
+    7, 8, 9, 10, 11, 12, 13, 14, 16, 17, 19, 21, 23, 25, 28, 31, 34, 37, 41, 45,
+    50, 55, 60, 66, 73, 80, 88, 97, 107, 118, 130, 143, 157, 173, 190, 209, 230,
+    253, 279, 307, 337, 371, 408, 449, 494, 544, 598, 658, 724, 796, 876, 963,
+    1060, 1166, 1282, 1411, 1552, 1707, 1878, 2066, 2272, 2499, 2749, 3024, 3327,
+    3660, 4026, 4428, 4871, 5358, 5894, 6484, 7132, 7845, 8630, 9493, 10442,
+    11487, 12635, 13899, 15289, 16818, 18500, 20350, 22385, 24623, 27086, 29794,
+    32767,
+)
+IMA_INDEX = (-1, -1, -1, -1, 2, 4, 6, 8)
+
+
+def _smpl_chunk(sample_rate, loop):
+    """``smpl`` chunk with one forward, endlessly repeating loop."""
+    begin, end = loop
+    header = struct.pack("<9I", 0, 0, 1000000000 // sample_rate, 60, 0, 0, 0, 1, 0)
+    # cue id, type (0 = forward), first and last sample, fraction, play count (0 = forever)
+    return b"smpl" + struct.pack("<I", 60) + header + struct.pack("<6I", 0, 0, begin,
+                                                                   end - 1, 0, 0)
+
+
+def ima_block_align(sample_rate):
+    """Bytes per IMA-ADPCM block (the usual 256 per 11025 Hz)."""
+    return 256 * max(1, sample_rate // 11025)
+
+
+def ima_samples_per_block(sample_rate):
+    return (ima_block_align(sample_rate) - 4) * 2 + 1
+
+
+def wav_header(num_samples, sample_rate=22050, loop=None, fmt="pcm16"):
+    """RIFF/fmt[/fact][/smpl]/data header for num_samples of mono audio."""
+    if fmt == "ima_adpcm":
+        align = ima_block_align(sample_rate)
+        per_block = ima_samples_per_block(sample_rate)
+        data_size = -(-num_samples // per_block) * align
+        fmt_chunk = struct.pack("<HHIIHHHH", FORMAT_TAG_IMA_ADPCM, 1, sample_rate,
+                                sample_rate * align // per_block, align, 4, 2, per_block)
+        extra = b"fact" + struct.pack("<II", 4, num_samples)
+    elif fmt in ("pcm16", "pcm8"):
+        width = 2 if fmt == "pcm16" else 1
+        data_size = num_samples * width
+        fmt_chunk = struct.pack("<HHIIHH", FORMAT_TAG_PCM, 1, sample_rate,
+                                sample_rate * width, width, 8 * width)
+        extra = b""
+    else:
+        raise ValueError(f"unknown WAV format: {fmt}")
+    if loop is not None:
+        extra += _smpl_chunk(sample_rate, loop)
+    return b"".join((
+        b"RIFF", struct.pack("<I", 20 + len(fmt_chunk) + len(extra) + data_size), b"WAVE",
+        b"fmt ", struct.pack("<I", len(fmt_chunk)), fmt_chunk,
+        extra,
+        b"data", struct.pack("<I", data_size),
+    ))
+
+
+def pcm16(samples):
+    """Clamp float samples and convert them to little-endian int16 bytes."""
+    if np is not None:
+        block = np.clip(np.asarray(samples, dtype=np.float64), -1.0, 1.0)
+        return (block * PCM_MAX).astype("<i2").tobytes()
+    pcm = array("h", [int((1.0 if s > 1.0 else -1.0 if s < -1.0 else s) * PCM_MAX)
+                      for s in samples])
+    if sys.byteorder == "big":
+        pcm.byteswap()
+    return pcm.tobytes()
+
+
+def pcm8(samples):
+    """Clamp float samples and round them to unsigned 8-bit bytes."""
+    if np is not None:
+        block = np.clip(np.asarray(samples, dtype=np.float64), -1.0, 1.0)
+        return (np.rint(block * 127) + 128).astype(np.uint8).tobytes()
+    return bytes(round((1.0 if s > 1.0 else -1.0 if s < -1.0 else s) * 127) + 128
+                 for s in samples)
+
+
+def _int16(data):
+    pcm = array("h", data)
+    if sys.byteorder == "big":
+        pcm.byteswap()
+    return pcm
+
+
+def ima_adpcm(pcm, sample_rate=22050):
+    """Encode int16 samples as IMA-ADPCM blocks (the last one padded)."""
+    per_block = ima_samples_per_block(sample_rate)
+    out = bytearray()
+    index = 0
+    for start in range(0, len(pcm), per_block):
+        block = list(pcm[start:start + per_block])
+        block += [block[-1]] * (per_block - len(block))
+        predictor = block[0]
+        out += struct.pack("<hBB", predictor, index, 0)
+        nibbles = []
+        for s in block[1:]:
+            step = IMA_STEPS[index]
+            diff = s - predictor
+            nib = 8 if diff < 0 else 0
+            diff = abs(diff)
+            delta = step >> 3
+            for bit in (4, 2, 1):
+                if diff >= step:
+                    nib |= bit
+                    diff -= step
+                    delta += step
+                step >>= 1
+            predictor += -delta if nib & 8 else delta
+            predictor = max(-32768, min(32767, predictor))
+            index = max(0, min(88, index + IMA_INDEX[nib & 7]))
+            nibbles.append(nib)
+        out += bytes(lo | hi << 4 for lo, hi in zip(nibbles[::2], nibbles[1::2]))
+    return bytes(out)
+
+
+def decode_ima_adpcm(data, num_samples, sample_rate=22050):
+    """Decode IMA-ADPCM blocks back to int16 samples."""
+    align = ima_block_align(sample_rate)
+    out = []
+    for start in range(0, len(data), align):
+        predictor, index, _ = struct.unpack_from("<hBB", data, start)
+        out.append(predictor)
+        for byte in data[start + 4:start + align]:
+            for nib in (byte & 15, byte >> 4):
+                step = IMA_STEPS[index]
+                delta = step >> 3
+                if nib & 4:
+                    delta += step
+                if nib & 2:
+                    delta += step >> 1
+                if nib & 1:
+                    delta += step >> 2
+                predictor += -delta if nib & 8 else delta
+                predictor = max(-32768, min(32767, predictor))
+                index = max(0, min(88, index + IMA_INDEX[nib & 7]))
+                out.append(predictor)
+    return out[:num_samples]
+
+
+def iter_wav(samples, sample_rate=22050, chunk_samples=WAV_CHUNK_SAMPLES, loop=None,
+             fmt="pcm16"):
+    """Yield the WAV file for samples (a buffer or an audio.Node) piece by piece.
+
+    PCM is converted a block at a time; IMA-ADPCM is encoded in one piece.
+    """
+    length = samples.length if isinstance(samples, Node) else len(samples)
+    yield wav_header(length, sample_rate, loop, fmt)
+    if isinstance(samples, Node):
+        blocks = samples.blocks(chunk_samples)
+    else:
+        blocks = (samples[start:start + chunk_samples]
+                  for start in range(0, length, chunk_samples))
+    if fmt == "ima_adpcm":
+        yield ima_adpcm(_int16(b"".join(pcm16(b) for b in blocks)), sample_rate)
+        return
+    convert = pcm8 if fmt == "pcm8" else pcm16
+    for block in blocks:
+        yield convert(block)
+
+
+def encode_wav(samples, sample_rate=22050, loop=None, fmt="pcm16"):
+    """Return the WAV file for samples as bytes."""
+    return b"".join(iter_wav(samples, sample_rate, loop=loop, fmt=fmt))
+
+
+def decode_wav(data):
+    """(sample rate, samples as floats) of a mono WAV written by this module."""
+    pos, chunks = 12, {}
+    while pos + 8 <= len(data):
+        cid, size = data[pos:pos + 4], struct.unpack_from("<I", data, pos + 4)[0]
+        chunks[cid] = data[pos + 8:pos + 8 + size]
+        pos += 8 + size + (size & 1)
+    tag, _, sample_rate, _, _, bits = struct.unpack_from("<HHIIHH", chunks[b"fmt "])
+    body = chunks[b"data"]
+    if tag == FORMAT_TAG_IMA_ADPCM:
+        num_samples = struct.unpack_from("<I", chunks[b"fact"])[0]
+        return sample_rate, [v / 32768 for v in decode_ima_adpcm(body, num_samples,
+                                                                 sample_rate)]
+    if bits == 8:
+        return sample_rate, [(b - 128) / 128 for b in body]
+    return sample_rate, [v / 32768 for v in _int16(body)]
+
+
+def encoding_report(samples, fmt, sample_rate=22050):
+    """File size, size relative to 16-bit PCM and SNR (dB) of samples in fmt."""
+    ref = [max(-1.0, min(1.0, s)) for s in
+           (samples.render() if isinstance(samples, Node) else samples)]
+    data = encode_wav(ref, sample_rate, fmt=fmt)
+    _, decoded = decode_wav(data)
+    signal = math.fsum(s * s for s in ref)
+    noise = math.fsum((s - d) ** 2 for s, d in zip(ref, decoded))
+    snr = 10 * math.log10(signal / noise) if noise and signal else float("inf")
+    pcm16_size = len(wav_header(len(ref))) + 2 * len(ref)
+    return len(data), len(data) / pcm16_size, snr
+
+
+def update_import(filepath, params):
+    """Set existing [params] keys in the Godot .import file of filepath.
+
+    Only existing .import files are updated (Godot creates new ones on
+    import, reading the loop from the smpl chunk). Returns the
+    outputs.write_if_changed() status, or None.
+    """
+    import_path = filepath + ".import"
+    if not os.path.exists(import_path):
+        return None
+    with open(import_path) as f:
+        text = f.read()
+    for key, value in params.items():
+        text = re.sub(rf"^{re.escape(key)}=.*$", f"{key}={value}", text, flags=re.M)
+    return write_if_changed(import_path, text.encode())
+
+
+def write_wav(filepath, samples, sample_rate=22050, chunked=False, loop=None, fmt="pcm16"):
+    """Write a mono WAV file from float samples (-1.0 to 1.0).
+
+    samples is a buffer or an audio.Node; nodes are always rendered and
+    written block by block. loop=(begin, end) marks a sample range to
+    repeat. fmt is one of FORMATS; Godot only imports the PCM ones.
+    Returns the outputs.write_if_changed() status of the WAV.
+    """
+    params = dict(GODOT_IMPORT_PARAMS.get(fmt, {}))
+    if loop is not None:
+        params.update({"edit/loop_mode": GODOT_LOOP_FORWARD, "edit/loop_begin": loop[0],
+                       "edit/loop_end": loop[1]})
+    else:
+        params.update(GODOT_NO_LOOP)
+    update_import(filepath, params)
+    if chunked or isinstance(samples, Node):
+        return write_if_changed(filepath, iter_wav(samples, sample_rate, loop=loop, fmt=fmt))
+    return write_if_changed(filepath, encode_wav(samples, sample_rate, loop, fmt))